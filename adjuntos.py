@@ -0,0 +1,191 @@
+# adjuntos.py
+"""
+Adjuntos de bajas/permisos: almacén direccionado por contenido en BAJAS_DIR.
+
+Cada subida se copia por trozos a un temporal calculando su SHA-256 a la vez;
+el contenido se guarda una sola vez en `objetos/<h[:2]>/<h>` aunque se suba
+muchas veces (el mismo justificante, por ejemplo). La tabla `bajas_adjuntos`
+de rrhh.db relaciona cada baja con sus adjuntos (nombre original, tamaño,
+hash y ruta), así que listar no necesita tocar el disco; los bytes se leen
+únicamente cuando el usuario pide descargar ese adjunto.
+
+Límites: `max_bytes` por archivo y `cuota_bytes` por usuario (suma del
+contenido distinto que tiene guardado; volver a subir algo ya guardado no
+consume cuota).
+"""
+import hashlib
+import os
+import tempfile
+from datetime import datetime
+from typing import BinaryIO, NamedTuple
+
+TABLA = "bajas_adjuntos"
+TROZO = 1 << 20   # 1 MiB
+MAX_MB = 10
+CUOTA_MB = 200
+
+
+class LimiteExcedido(ValueError):
+    pass
+
+
+class Adjunto(NamedTuple):
+    ruta: str
+    nombre: str
+    tamano: int | None    # None si el archivo no existe
+    miniatura: str | None = None
+
+
+class _Subida(NamedTuple):
+    nombre: str
+    sha256: str
+    tamano: int
+    temporal: str
+
+
+def formato_tamano(n: int | None) -> str:
+    if n is None:
+        return "no encontrado"
+    if n < 1024:
+        return f"{n} B"
+    if n < 1024 ** 2:
+        return f"{n / 1024:.1f} KB".replace(".", ",")
+    return f"{n / 1024 ** 2:.1f} MB".replace(".", ",")
+
+
+def abrir(ruta: str) -> BinaryIO:
+    """Archivo abierto en binario, para pasarlo tal cual a st.download_button."""
+    return open(ruta, "rb")
+
+
+def ruta_objeto(directorio: str, sha256: str) -> str:
+    return os.path.join(directorio, "objetos", sha256[:2], sha256)
+
+
+def uso_usuario(conn, usuario: str) -> tuple[int, set[str]]:
+    """(bytes de contenido distinto guardado por el usuario, hashes que ya tiene)."""
+    filas = conn.execute(
+        f"SELECT DISTINCT sha256, tamano FROM {TABLA} WHERE usuario = ? AND sha256 IS NOT NULL;", (usuario,)
+    ).fetchall()
+    return sum(t or 0 for _, t in filas), {h for h, _ in filas}
+
+
+def guardar_bytes(directorio: str, datos: bytes) -> tuple[str, str]:
+    """Guarda `datos` en el almacén (si no estaban ya) y devuelve (sha256, ruta)."""
+    sha256 = hashlib.sha256(datos).hexdigest()
+    ruta = ruta_objeto(directorio, sha256)
+    if not os.path.exists(ruta):
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        fd, temporal = tempfile.mkstemp(dir=os.path.dirname(ruta), prefix=".subida-")
+        with os.fdopen(fd, "wb") as out:
+            out.write(datos)
+        os.replace(temporal, ruta)
+    return sha256, ruta
+
+
+def _copiar(directorio: str, nombre: str, origen: BinaryIO, max_bytes: int) -> _Subida:
+    """Copia `origen` a un temporal del almacén calculando hash y tamaño; corta si supera max_bytes."""
+    carpeta = os.path.join(directorio, "objetos")
+    os.makedirs(carpeta, exist_ok=True)
+    h, tamano = hashlib.sha256(), 0
+    fd, temporal = tempfile.mkstemp(dir=carpeta, prefix=".subida-")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            if hasattr(origen, "seek"):
+                origen.seek(0)
+            while trozo := origen.read(TROZO):
+                tamano += len(trozo)
+                if tamano > max_bytes:
+                    raise LimiteExcedido(f"«{nombre}» supera el máximo de {formato_tamano(max_bytes)} por archivo.")
+                h.update(trozo)
+                out.write(trozo)
+    except BaseException:
+        os.remove(temporal)
+        raise
+    return _Subida(nombre, h.hexdigest(), tamano, temporal)
+
+
+def guardar(conn, directorio: str, baja_id: int, usuario: str, archivos: list[tuple[str, BinaryIO]],
+            max_bytes: int = MAX_MB << 20, cuota_bytes: int = CUOTA_MB << 20) -> list[Adjunto]:
+    """
+    Guarda los archivos (nombre, objeto con .read) de la baja `baja_id` en el almacén y
+    los registra en bajas_adjuntos dentro de la transacción de `conn`.
+    Lanza LimiteExcedido (sin guardar nada) si un archivo o la cuota del usuario se superan.
+    Llamar después de alguna escritura en `conn` (p. ej. el INSERT de la baja): así la
+    transacción ya tiene el bloqueo de escritura y nadie puede borrar un objeto reutilizado
+    antes de registrarlo.
+    """
+    usado, propios = uso_usuario(conn, usuario)
+    subidas = []
+    try:
+        for nombre, origen in archivos:
+            s = _copiar(directorio, nombre, origen, max_bytes)
+            subidas.append(s)
+            if s.sha256 not in propios:
+                propios.add(s.sha256)
+                usado += s.tamano
+                if usado > cuota_bytes:
+                    raise LimiteExcedido(
+                        f"Se supera tu cuota de adjuntos ({formato_tamano(cuota_bytes)}); "
+                        f"ya tienes {formato_tamano(usado - s.tamano)} guardados."
+                    )
+    except BaseException:
+        for s in subidas:
+            os.remove(s.temporal)
+        raise
+
+    ahora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    guardados = []
+    for s in subidas:
+        ruta = ruta_objeto(directorio, s.sha256)
+        if os.path.exists(ruta):
+            os.remove(s.temporal)        # contenido ya guardado: se reutiliza
+        else:
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            os.replace(s.temporal, ruta)
+        guardados.append(Adjunto(ruta, s.nombre, s.tamano))
+    conn.executemany(
+        f"INSERT INTO {TABLA}(baja_id, usuario, nombre, sha256, tamano, ruta, fecha_subida) VALUES (?, ?, ?, ?, ?, ?, ?);",
+        [(baja_id, usuario, s.nombre, s.sha256, s.tamano, a.ruta, ahora) for s, a in zip(subidas, guardados)]
+    )
+    return guardados
+
+
+def listar(conn, usuario: str, bajas: list[int] | None = None) -> dict[int, list[Adjunto]]:
+    """Adjuntos del usuario agrupados por baja_id (una consulta, sin acceder a disco); solo los de `bajas` si se indica."""
+    por_baja: dict[int, list[Adjunto]] = {}
+    filtro, params = "", [usuario]
+    if bajas is not None:
+        if not bajas:
+            return por_baja
+        filtro = f" AND baja_id IN ({', '.join('?' * len(bajas))})"
+        params += [int(b) for b in bajas]
+    for baja_id, ruta, nombre, tamano, miniatura in conn.execute(
+        f"SELECT baja_id, ruta, nombre, tamano, miniatura FROM {TABLA} WHERE usuario = ?{filtro} ORDER BY baja_id, id;",
+        params
+    ):
+        por_baja.setdefault(baja_id, []).append(Adjunto(ruta, nombre, tamano, miniatura))
+    return por_baja
+
+
+def migrar_archivos(conn):
+    """Paso de migración: pasa las rutas de bajas.archivos ('a;b;c') a filas de bajas_adjuntos."""
+    filas = []
+    for baja_id, usuario, archivos, fecha in conn.execute(
+        "SELECT id, usuario, archivos, fecha_registro FROM bajas WHERE IFNULL(archivos, '') <> '';"
+    ).fetchall():
+        for ruta in (r for r in archivos.split(";") if r):
+            sha256, tamano = None, None
+            try:
+                h = hashlib.sha256()
+                with open(ruta, "rb") as f:
+                    while trozo := f.read(TROZO):
+                        h.update(trozo)
+                sha256, tamano = h.hexdigest(), os.path.getsize(ruta)
+            except OSError:
+                pass
+            filas.append((baja_id, usuario, os.path.basename(ruta), sha256, tamano, ruta, fecha))
+    conn.executemany(
+        f"INSERT INTO {TABLA}(baja_id, usuario, nombre, sha256, tamano, ruta, fecha_subida) VALUES (?, ?, ?, ?, ?, ?, ?);",
+        filas
+    )
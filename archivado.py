@@ -0,0 +1,242 @@
+# archivado.py
+"""
+Archivo por años de los fichajes antiguos.
+
+fichajes.db solo conserva los años "calientes" (el actual y los anteriores hasta
+ANIOS_CALIENTES). `archivar` mueve cada año cerrado de `fichajes` y
+`horas_diarias` a `archivo/fichajes_<año>.db`, junto a la base:
+  1. copia el año a `fichajes_<año>.db.parcial` (INSERT OR IGNORE por id: repetir
+     tras un fallo es seguro) y comprueba que no falta ninguna fila,
+  2. renombra el archivo a su nombre definitivo (desde ahí `es_archivado` rechaza
+     fichajes nuevos del año),
+  3. en una transacción BEGIN IMMEDIATE copia lo que entró entre 1 y 2, rehace
+     esos días de horas_diarias en el archivo y borra de la base caliente solo
+     los fichajes que ya están en el archivo.
+Así la base caliente queda pequeña (copias, VACUUM y caché de páginas) y los
+archivos de años cerrados solo se abren cuando alguien los pide.
+
+`lectura(ruta, tabla, desde, hasta)` da una conexión y el origen FROM para un
+rango de fechas: la tabla caliente tal cual si el rango no toca años archivados;
+si los toca, hace ATTACH solo de esos años y devuelve un UNION ALL. La parte
+caliente se limita a fechas posteriores al último año archivado, de modo que
+un archivado a medias (paso 2 hecho, 3 no) no duplica filas.
+"""
+import argparse
+import os
+import re
+import sqlite3
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+import db
+import fichajes
+import horas
+
+ANIOS_CALIENTES = 2          # el año actual y el anterior se quedan en fichajes.db
+TABLAS = {"fichajes": "fecha_local", "horas_diarias": "fecha"}   # tabla -> columna de fecha
+CARPETA = "archivo"
+
+
+def ruta_anio(ruta: str, anio: int) -> str:
+    base = os.path.splitext(os.path.basename(ruta))[0]
+    return os.path.join(os.path.dirname(os.path.abspath(ruta)), CARPETA, f"{base}_{anio}.db")
+
+
+def anios_archivados(ruta: str) -> list[int]:
+    """Años con archivo definitivo, en orden (se mira el disco: el archivado corre en otro proceso)."""
+    carpeta = os.path.dirname(ruta_anio(ruta, 0))
+    patron = re.compile(re.escape(os.path.splitext(os.path.basename(ruta))[0]) + r"_(\d{4})\.db$")
+    try:
+        nombres = os.listdir(carpeta)
+    except FileNotFoundError:
+        return []
+    return sorted(int(m.group(1)) for m in map(patron.match, nombres) if m)
+
+
+def es_archivado(ruta: str, dia: date) -> bool:
+    """True si `dia` cae en un año ya archivado (cerrado: no admite fichajes nuevos)."""
+    anios = anios_archivados(ruta)
+    return bool(anios) and dia.year <= anios[-1]
+
+
+def _columnas(conn, esquema: str, tabla: str) -> list[str]:
+    return [fila[1] for fila in conn.execute(f"PRAGMA {esquema}.table_info({tabla});")]
+
+
+@contextmanager
+def lectura(ruta: str, tabla: str, desde: date, hasta: date):
+    """
+    (conexión, origen) para consultar `tabla` entre `desde` y `hasta`:
+        with archivado.lectura(ruta, "horas_diarias", d_ini, d_fin) as (conn, origen):
+            conn.execute(f"SELECT ... FROM {origen} WHERE fecha BETWEEN ? AND ?", ...)
+    Solo lectura. Con años archivados en el rango usa una conexión propia (no del pool)
+    que se cierra al salir, y con ella los ATTACH.
+    """
+    archivados = anios_archivados(ruta)
+    anios = [a for a in archivados if desde.year <= a <= hasta.year]
+    if not anios:
+        with db.conexion(ruta) as conn:
+            yield conn, tabla
+        return
+
+    conn = db.abrir(ruta)
+    try:
+        columnas = _columnas(conn, "main", tabla)
+        partes = [f"SELECT {', '.join(columnas)} FROM main.{tabla} WHERE {TABLAS[tabla]} >= '{archivados[-1] + 1}'"]
+        for anio in anios:
+            conn.execute(f"ATTACH DATABASE ? AS a{anio};", (ruta_anio(ruta, anio),))
+            propias = set(_columnas(conn, f"a{anio}", tabla))   # archivos de antes de una migración nueva
+            lista = ", ".join(c if c in propias else f"NULL AS {c}" for c in columnas)
+            partes.append(f"SELECT {lista} FROM a{anio}.{tabla}")
+        yield conn, "(" + " UNION ALL ".join(partes) + ")"
+    finally:
+        conn.close()
+
+
+def _crear(conn, destino: str):
+    """Crea `destino` con el mismo esquema (tablas e índices) de fichajes y horas_diarias que la base caliente."""
+    ddl = [s for (s,) in conn.execute(
+        f"SELECT sql FROM main.sqlite_master WHERE tbl_name IN ({', '.join('?' * len(TABLAS))}) "
+        "AND sql IS NOT NULL ORDER BY type DESC;", list(TABLAS)     # 'table' antes que 'index'
+    )]
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    nueva = sqlite3.connect(destino)      # journal por defecto (no WAL): un solo fichero que se puede renombrar
+    try:
+        with nueva:
+            for sql in ddl:
+                nueva.execute(sql)
+    finally:
+        nueva.close()
+
+
+def _copiar(conn, rango: tuple[str, str], tablas=TABLAS):
+    """Copia el año de main a arch (base adjunta)."""
+    for tabla in tablas:
+        col = TABLAS[tabla]
+        comunes = [c for c in _columnas(conn, "main", tabla) if c in set(_columnas(conn, "arch", tabla))]
+        lista = ", ".join(comunes)
+        # fichajes: el id no cambia nunca (IGNORE); horas_diarias: manda la base caliente (REPLACE)
+        conflicto = "IGNORE" if tabla == "fichajes" else "REPLACE"
+        conn.execute(
+            f"INSERT OR {conflicto} INTO arch.{tabla} ({lista}) SELECT {lista} FROM main.{tabla} "
+            f"WHERE {col} >= ? AND {col} < ?;", rango
+        )
+
+
+def _faltan(conn, rango: tuple[str, str]) -> int:
+    return conn.execute(
+        "SELECT COUNT(*) FROM main.fichajes f WHERE fecha_local >= ? AND fecha_local < ? "
+        "AND NOT EXISTS (SELECT 1 FROM arch.fichajes a WHERE a.id = f.id);", rango
+    ).fetchone()[0]
+
+
+def _recalcular_archivo(conn, dias: list[tuple[str, str]]):
+    """horas_diarias del archivo para esos (empleado, día), a partir de los fichajes del archivo."""
+    for empleado, dia in dias:
+        siguiente = (date.fromisoformat(dia) + timedelta(days=1)).strftime("%Y-%m-%d")
+        filas = conn.execute(
+            "SELECT tipo, fecha_local FROM arch.fichajes WHERE empleado = ? AND fecha_local >= ? "
+            "AND fecha_local < ? ORDER BY fecha_local, id;", (empleado, dia, siguiente)
+        ).fetchall()
+        marcas, segundos, incompleto = horas.emparejar_dia(filas)
+        conn.execute(
+            "INSERT OR REPLACE INTO arch.horas_diarias (empleado, fecha, segundos, marcas, incompleto) "
+            "VALUES (?, ?, ?, ?, ?);",
+            (empleado, dia, segundos, horas.SEPARADOR_MARCAS.join(marcas), int(incompleto))
+        )
+
+
+def archivar_anio(ruta: str, anio: int) -> int:
+    """Mueve el año `anio` de la base caliente a su archivo. Devuelve los fichajes movidos."""
+    destino = ruta_anio(ruta, anio)
+    objetivo = destino if os.path.exists(destino) else destino + ".parcial"
+    rango = (f"{anio}-01-01", f"{anio + 1}-01-01")
+    conn = db.abrir(ruta)
+    try:
+        if not os.path.exists(objetivo):
+            _crear(conn, objetivo)
+        # 1. Copia del año sin bloquear la base (lo que entre mientras lo recoge el paso 3)
+        conn.execute("ATTACH DATABASE ? AS arch;", (objetivo,))
+        try:
+            with conn:
+                _copiar(conn, rango)
+            faltan = _faltan(conn, rango)
+        finally:
+            conn.execute("DETACH DATABASE arch;")
+        if faltan:
+            raise RuntimeError(f"{anio}: {faltan} fichajes no llegaron a {objetivo}; no se borra nada")
+        # 2. Con el nombre definitivo, es_archivado(año) es True y no se admiten fichajes nuevos del año
+        if objetivo != destino:
+            os.replace(objetivo, destino)
+        # 3. Con la base bloqueada (BEGIN IMMEDIATE): copia lo que entró entre 1 y 2, rehace sus días
+        #    en el archivo, comprueba y borra de la caliente solo los ids que ya están en el archivo
+        conn.execute("ATTACH DATABASE ? AS arch;", (destino,))
+        try:
+            conn.execute("BEGIN IMMEDIATE;")
+            with conn:
+                nuevos = conn.execute(
+                    "SELECT DISTINCT empleado, substr(fecha_local, 1, 10) FROM main.fichajes f "
+                    "WHERE fecha_local >= ? AND fecha_local < ? "
+                    "AND NOT EXISTS (SELECT 1 FROM arch.fichajes a WHERE a.id = f.id);", rango
+                ).fetchall()
+                if nuevos:
+                    _copiar(conn, rango, ("fichajes",))
+                    _recalcular_archivo(conn, nuevos)
+                faltan = _faltan(conn, rango)
+                if faltan:
+                    raise RuntimeError(f"{anio}: {faltan} fichajes no llegaron a {destino}; no se borra nada")
+                n = conn.execute(
+                    "DELETE FROM main.fichajes WHERE fecha_local >= ? AND fecha_local < ? "
+                    "AND id IN (SELECT id FROM arch.fichajes);", rango
+                ).rowcount
+                conn.execute("DELETE FROM main.horas_diarias WHERE fecha >= ? AND fecha < ?;", rango)
+        finally:
+            conn.execute("DETACH DATABASE arch;")
+        return n
+    finally:
+        conn.close()
+
+
+def archivar(ruta: str, anios_calientes: int = ANIOS_CALIENTES, hoy: date | None = None,
+             vacuum: bool = False) -> dict[int, int]:
+    """
+    Archiva todos los años anteriores al primer año caliente. Un año con fichajes aún
+    admisibles (fichajes.MAX_ANTIGUEDAD) nunca se archiva. Devuelve {año: fichajes movidos}.
+    """
+    hoy = hoy or date.today()
+    primero_caliente = min(hoy.year - max(anios_calientes, 1) + 1, (hoy - fichajes.MAX_ANTIGUEDAD).year)
+    # Una pasada por la tabla; incluye los años archivados a medias (quedan filas ocultas en caliente)
+    with db.conexion(ruta) as conn:
+        anios = [int(a) for (a,) in conn.execute(
+            "SELECT DISTINCT substr(fecha_local, 1, 4) FROM fichajes WHERE fecha_local < ? ORDER BY 1;",
+            (f"{primero_caliente}-01-01",)
+        )]
+    movidos = {anio: archivar_anio(ruta, anio) for anio in anios}
+    if movidos:
+        db.cerrar_todas()      # ninguna conexión del pool debe retener páginas durante el VACUUM / checkpoint
+        conn = db.abrir(ruta)
+        try:
+            if vacuum:
+                conn.execute("VACUUM;")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE);")
+        finally:
+            conn.close()
+    return movidos
+
+
+if __name__ == "__main__":
+    import migraciones
+
+    ap = argparse.ArgumentParser(description="Mueve los años cerrados de fichajes.db a archivos por año.")
+    ap.add_argument("ruta", help="ruta de fichajes.db")
+    ap.add_argument("--anios-calientes", type=int, default=ANIOS_CALIENTES,
+                    help=f"años que se quedan en la base (por defecto {ANIOS_CALIENTES}: el actual y el anterior)")
+    ap.add_argument("--vacuum", action="store_true", help="compacta fichajes.db después de archivar")
+    args = ap.parse_args()
+
+    migraciones.migrar(args.ruta, migraciones.FICHAJES)
+    movidos = archivar(args.ruta, args.anios_calientes, vacuum=args.vacuum)
+    for anio, n in movidos.items():
+        print(f"{anio}: {n} fichajes -> {ruta_anio(args.ruta, anio)}")
+    if not movidos:
+        print("nada que archivar")
@@ -0,0 +1,81 @@
+"""
+Memoria del listado de bajas con muchos adjuntos grandes.
+
+Crea `--archivos` adjuntos de `--mb` MB y simula `--sesiones` usuarios con el
+listado abierto. Streamlit guarda en memoria los bytes de cada download_button
+de la ejecución en curso de cada sesión, así que:
+  - antes: cada rerun lee todos los adjuntos (f.read()) y la sesión los retiene,
+  - ahora: cada rerun usa los metadatos de bajas_adjuntos (adjuntos.Adjunto, sin
+    tocar el disco) y la sesión retiene, como mucho, el adjunto cuya descarga ha preparado.
+Cada modo se mide en un proceso aparte (RSS máximo con resource.getrusage).
+
+    python bench/bench_adjuntos.py [--archivos 40] [--mb 5] [--sesiones 10] [--reruns 5]
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import adjuntos
+
+
+def _rss_max_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024   # Linux: KiB
+
+
+def _simular(modo: str, rutas: list[str], sesiones: int, reruns: int):
+    base = _rss_max_mb()
+    retenido = {}   # sesión -> bytes que Streamlit mantiene para sus download_button
+    # Lo que adjuntos.listar lee de la tabla (nombre y tamaño guardados al subir)
+    lista = [adjuntos.Adjunto(r, os.path.basename(r), os.path.getsize(r)) for r in rutas]
+    t0 = time.perf_counter()
+    for _ in range(reruns):
+        for s in range(sesiones):
+            if modo == "antes":
+                datos = []
+                for ruta in rutas:
+                    with open(ruta, "rb") as f:
+                        datos.append(f.read())
+                retenido[s] = datos
+            else:
+                with adjuntos.abrir(lista[s % len(lista)].ruta) as f:
+                    retenido[s] = [f.read()]
+    por_rerun = (time.perf_counter() - t0) / (reruns * sesiones)
+    print(f"{modo:6s} RSS máx {_rss_max_mb():8.1f} MB (+{_rss_max_mb() - base:7.1f} MB)  "
+          f"{por_rerun * 1000:8.2f} ms/rerun del listado")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--archivos", type=int, default=40)
+    ap.add_argument("--mb", type=float, default=5)
+    ap.add_argument("--sesiones", type=int, default=10)
+    ap.add_argument("--reruns", type=int, default=5)
+    ap.add_argument("--modo", choices=["antes", "ahora"], help=argparse.SUPPRESS)
+    ap.add_argument("--dir", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.modo:
+        rutas = sorted(os.path.join(args.dir, n) for n in os.listdir(args.dir))
+        _simular(args.modo, rutas, args.sesiones, args.reruns)
+        return
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        bloque = os.urandom(1 << 20)
+        for i in range(args.archivos):
+            with open(os.path.join(carpeta, f"adjunto{i:03d}.pdf"), "wb") as f:
+                for _ in range(int(args.mb)):
+                    f.write(bloque)
+                f.write(bloque[:int((args.mb % 1) * (1 << 20))])
+        print(f"{args.archivos} adjuntos de {args.mb:g} MB, {args.sesiones} sesiones, {args.reruns} reruns")
+        for modo in ("antes", "ahora"):
+            subprocess.run([sys.executable, __file__, "--modo", modo, "--dir", carpeta,
+                            "--sesiones", str(args.sesiones), "--reruns", str(args.reruns)], check=True)
+
+
+if __name__ == "__main__":
+    main()
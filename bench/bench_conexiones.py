@@ -0,0 +1,96 @@
+"""
+Benchmark de concurrencia de escrituras en fichajes.db.
+
+Simula la hora punta de entrada: N hilos insertando fichajes a la vez.
+Compara el acceso anterior (sqlite3.connect por operación, ajustes por defecto)
+con el pool compartido de db.py (WAL, synchronous=NORMAL, busy_timeout).
+
+    python bench/bench_conexiones.py --hilos 32 --inserciones 200
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import db
+
+ESQUEMA = """
+    CREATE TABLE IF NOT EXISTS fichajes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        empleado TEXT NOT NULL,
+        fecha_local TEXT NOT NULL,
+        fecha_utc   TEXT NOT NULL,
+        tipo TEXT NOT NULL CHECK (tipo IN ('Entrada','Salida')),
+        observaciones TEXT,
+        fuente TEXT DEFAULT 'movil',
+        created_at_utc TEXT DEFAULT (datetime('now'))
+    );
+"""
+INSERT = ("INSERT INTO fichajes (empleado, fecha_local, fecha_utc, tipo, observaciones) "
+          "VALUES (?, ?, ?, ?, ?);")
+
+
+def _fila(n: int) -> tuple:
+    ahora = datetime.now()
+    return (f"emp{n}", ahora.strftime("%Y-%m-%d %H:%M:%S"),
+            datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"), "Entrada", "")
+
+
+def insertar_directo(ruta: str, n: int):
+    # Igual que el código anterior: conexión nueva por operación, sin cerrar
+    with sqlite3.connect(ruta) as conn:
+        conn.execute(INSERT, _fila(n))
+        conn.commit()
+
+
+def insertar_pool(ruta: str, n: int):
+    with db.conexion(ruta) as conn:
+        conn.execute(INSERT, _fila(n))
+
+
+def ejecutar(nombre: str, insertar, ruta: str, hilos: int, inserciones: int):
+    errores = []
+
+    def trabajador(i):
+        for _ in range(inserciones):
+            try:
+                insertar(ruta, i)
+            except sqlite3.OperationalError as e:
+                errores.append(str(e))
+
+    ts = [threading.Thread(target=trabajador, args=(i,)) for i in range(hilos)]
+    t0 = time.perf_counter()
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    dt = time.perf_counter() - t0
+
+    with sqlite3.connect(ruta) as conn:
+        ok = conn.execute("SELECT COUNT(*) FROM fichajes").fetchone()[0]
+    print(f"{nombre:<8} {ok:>7} filas en {dt:6.2f}s  ->  {ok / dt:8.0f} inserciones/s  "
+          f"({len(errores)} errores 'database is locked')")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--hilos", type=int, default=32)
+    ap.add_argument("--inserciones", type=int, default=200, help="inserciones por hilo")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for nombre, funcion in (("antes", insertar_directo), ("pool", insertar_pool)):
+            ruta = os.path.join(tmp, f"{nombre}.db")
+            with sqlite3.connect(ruta) as conn:
+                conn.execute(ESQUEMA)
+            ejecutar(nombre, funcion, ruta, args.hilos, args.inserciones)
+        db.cerrar_todas()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Exportación para nóminas sobre un fichajes.db grande (10M marcas por defecto).
+
+Genera las marcas con una CTE recursiva dentro de SQLite (empleados x días x 4
+marcas, con alguna suelta) y exporta el rango entero con exportacion.exportar:
+fichajes en CSV, horas en CSV y horas en Parquet. Cada exportación va en un
+proceso aparte para medir su RSS máximo (resource.getrusage). Con --comparar
+mide también la forma anterior (pd.read_sql_query de todo + horas.resumen_diario),
+que carga todo en memoria: con 10M marcas necesita varios GB.
+
+    python bench/bench_exportacion.py [--fichajes 10000000] [--empleados 2000] [--comparar]
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import db
+import exportacion
+import migraciones
+
+INICIO = date(2020, 1, 1)
+GENERAR = """
+    WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i + 1 < :total)
+    INSERT INTO fichajes (empleado, fecha_local, fecha_utc, tipo, fuente)
+    SELECT empleado, f, f, CASE WHEN i % 2 = 0 OR i % 997 = 0 THEN 'Entrada' ELSE 'Salida' END, 'bench'
+    FROM (
+        SELECT i,
+               printf('emp%05d', i / (:dias * 4)) AS empleado,
+               date(:inicio, '+' || (i / 4 % :dias) || ' days') || ' ' ||
+               printf('%02d:%02d:00', CASE i % 4 WHEN 0 THEN 8 WHEN 1 THEN 14 WHEN 2 THEN 15 ELSE 18 END,
+                      abs(random()) % 30) AS f
+        FROM n
+    );
+"""
+
+
+def _rss_max_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024   # Linux: KiB
+
+
+def _medir(modo: str, ruta: str, salida: str):
+    base = _rss_max_mb()
+    t0 = time.perf_counter()
+    if modo == "antes":
+        import pandas as pd
+        import horas
+        with db.conexion(ruta) as conn:
+            df = pd.read_sql_query("SELECT empleado, fecha_local, tipo FROM fichajes;", conn)
+        resumen = horas.resumen_diario(df)
+        resumen["marcas"] = resumen["marcas"].map(horas.SEPARADOR_MARCAS.join)
+        resumen.to_csv(salida, index=False)
+        n = len(resumen)
+    else:
+        tipo, formato = modo.split("-")
+        n = exportacion.exportar(ruta, salida, INICIO, date.today(), tipo, formato)
+    s = time.perf_counter() - t0
+    print(f"{modo:16s} {n:>10} filas  {s:7.1f} s  {n / s:>9.0f} filas/s  "
+          f"{os.path.getsize(salida) / 2**20:7.1f} MB  RSS máx {_rss_max_mb():7.1f} MB (+{_rss_max_mb() - base:.1f})")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--fichajes", type=int, default=10_000_000)
+    ap.add_argument("--empleados", type=int, default=2000)
+    ap.add_argument("--comparar", action="store_true", help="mide también la exportación con pandas en memoria")
+    ap.add_argument("--modo", help=argparse.SUPPRESS)
+    ap.add_argument("--ruta", help=argparse.SUPPRESS)
+    ap.add_argument("--salida", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.modo:
+        _medir(args.modo, args.ruta, args.salida)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = os.path.join(tmp, "fichajes.db")
+        migraciones.migrar(ruta, migraciones.FICHAJES)
+        t0 = time.perf_counter()
+        with db.conexion(ruta) as conn:
+            conn.execute(GENERAR, {"total": args.fichajes, "inicio": INICIO.isoformat(),
+                                   "dias": max(1, args.fichajes // (args.empleados * 4))})
+        db.cerrar_todas()
+        print(f"{args.fichajes} fichajes sintéticos generados en {time.perf_counter() - t0:.1f}s "
+              f"({os.path.getsize(ruta) / 2**20:.0f} MB)\n")
+
+        modos = ["fichajes-csv", "horas-csv", "horas-parquet"] + (["antes"] if args.comparar else [])
+        for modo in modos:
+            salida = os.path.join(tmp, f"{modo}.{'parquet' if modo.endswith('parquet') else 'csv'}")
+            subprocess.run([sys.executable, __file__, "--modo", modo, "--ruta", ruta, "--salida", salida], check=True)
+            os.remove(salida)
+
+
+if __name__ == "__main__":
+    main()
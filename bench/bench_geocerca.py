@@ -0,0 +1,77 @@
+"""
+Micro-benchmark de la comprobación de proximidad a la oficina.
+
+Compara el cálculo anterior (geopy.distance.geodesic contra la oficina en cada
+rerun) con geocerca.Geocerca (recuadro + haversine, geodesic solo cerca del
+borde) y con geocerca.sede_en_sesion (además, cacheado mientras el móvil no se
+mueve). Las posiciones son de móviles repartidos por la provincia, con unos
+pocos dentro de alguna sede, y cada móvil repite posición varias veces como
+pasa con los reruns.
+
+    python bench/bench_geocerca.py [--sedes 5] [--posiciones 20000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import geopy.distance
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import geocerca
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sedes", type=int, default=5)
+    ap.add_argument("--posiciones", type=int, default=20000)
+    ap.add_argument("--reruns", type=int, default=5, help="reruns con la misma posición por móvil")
+    args = ap.parse_args()
+
+    rnd = random.Random(0)
+    base = geocerca.SEDES_POR_DEFECTO[0]
+    sedes = [{"nombre": f"sede{i}", "lat": base["lat"] + rnd.uniform(-0.3, 0.3),
+              "lon": base["lon"] + rnd.uniform(-0.3, 0.3), "radio_m": 300} for i in range(args.sedes)]
+    cerca = geocerca.Geocerca.desde_config(sedes)
+
+    moviles = []
+    for _ in range(args.posiciones // args.reruns):
+        if rnd.random() < 0.1:
+            s = rnd.choice(sedes)
+            p = (s["lat"] + rnd.uniform(-0.003, 0.003), s["lon"] + rnd.uniform(-0.003, 0.003))
+        else:
+            p = (base["lat"] + rnd.uniform(-0.5, 0.5), base["lon"] + rnd.uniform(-0.5, 0.5))
+        moviles.append(p)
+    posiciones = [p for p in moviles for _ in range(args.reruns)]
+
+    # Anterior: geodesic contra cada sede en cada rerun
+    t0 = time.perf_counter()
+    ref = []
+    for lat, lon in posiciones:
+        dentro = [s["nombre"] for s in sedes
+                  if geopy.distance.geodesic((s["lat"], s["lon"]), (lat, lon)).m <= s["radio_m"]]
+        ref.append(dentro)
+    t_geo = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    res = [cerca.sede_cercana(lat, lon)[0] for lat, lon in posiciones]
+    t_cerca = time.perf_counter() - t0
+
+    estados = {}
+    t0 = time.perf_counter()
+    for i, (lat, lon) in enumerate(posiciones):
+        geocerca.sede_en_sesion(estados.setdefault(i // args.reruns, {}), cerca, lat, lon)
+    t_sesion = time.perf_counter() - t0
+
+    discrepancias = sum((r is None) != (not d) or (r is not None and r.nombre not in d) for r, d in zip(res, ref))
+    n = len(posiciones)
+    print(f"{n} posiciones, {args.sedes} sedes, {sum(bool(d) for d in ref)} dentro de alguna sede")
+    print(f"geodesic por llamada:   {t_geo / n * 1e6:8.1f} µs/comprobación")
+    print(f"Geocerca:               {t_cerca / n * 1e6:8.1f} µs/comprobación")
+    print(f"Geocerca + sesión:      {t_sesion / n * 1e6:8.1f} µs/comprobación")
+    print(f"discrepancias con geodesic: {discrepancias}")
+
+
+if __name__ == "__main__":
+    main()
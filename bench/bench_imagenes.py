@@ -0,0 +1,97 @@
+"""
+Reducción de fotos adjuntas a bajas: latencia del envío y espacio en disco.
+
+Genera `--fotos` fotos sintéticas tipo cámara de móvil (4000x3000, JPEG
+calidad 92) y registra una baja por foto en un rrhh.db temporal:
+  - síncrono: el envío reduce la imagen antes de volver,
+  - asíncrono: el envío solo guarda el original y encola (imagenes.encolar).
+Informa de la latencia media/máxima del envío, del tiempo hasta que el pool
+termina y del espacio ocupado por los adjuntos antes y después.
+
+    python bench/bench_imagenes.py [--fotos 8] [--max-px 2000] [--calidad 80]
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import adjuntos
+import db
+import imagenes
+import migraciones
+
+
+def _foto(semilla: int) -> bytes:
+    rnd = np.random.default_rng(semilla)
+    alto, ancho = 3000, 4000
+    y, x = np.mgrid[0:alto, 0:ancho]
+    base = (180 + 40 * np.sin(x / 300 + semilla) * np.cos(y / 450)).astype(np.float32)
+    # "texto": bandas oscuras finas, como un documento fotografiado
+    base[(y // 40) % 3 == 0] -= 90 * ((x[(y // 40) % 3 == 0] // 7) % 2)
+    ruido = rnd.normal(0, 6, (alto, ancho, 3)).astype(np.float32)
+    img = np.clip(base[..., None] + ruido, 0, 255).astype(np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(img).save(buf, "JPEG", quality=92)
+    return buf.getvalue()
+
+
+def _ocupado(directorio: str) -> int:
+    return sum(os.path.getsize(os.path.join(r, f)) for r, _, fs in os.walk(directorio) for f in fs)
+
+
+def _enviar(ruta_db: str, directorio: str, usuario: str, nombre: str, datos: bytes) -> int:
+    with db.conexion(ruta_db) as conn:
+        cur = conn.execute(
+            "INSERT INTO bajas(usuario, tipo, fecha_inicio, descripcion, archivos, estado, fecha_registro) "
+            "VALUES (?, 'Enfermedad común', '2025-01-01', '', '', 'Notificada', ?);",
+            (usuario, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        )
+        adjuntos.guardar(conn, directorio, cur.lastrowid, usuario, [(nombre, io.BytesIO(datos))],
+                         max_bytes=50 << 20, cuota_bytes=1 << 40)
+    return cur.lastrowid
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--fotos", type=int, default=8)
+    ap.add_argument("--max-px", type=int, default=imagenes.MAX_PX)
+    ap.add_argument("--calidad", type=int, default=imagenes.CALIDAD)
+    args = ap.parse_args()
+
+    fotos = [_foto(i) for i in range(args.fotos)]
+    print(f"{args.fotos} fotos, {sum(map(len, fotos)) / args.fotos / 2**20:.1f} MB de media")
+
+    for modo in ("síncrono", "asíncrono"):
+        with tempfile.TemporaryDirectory() as carpeta:
+            ruta_db = os.path.join(carpeta, "rrhh.db")
+            migraciones.migrar(ruta_db, migraciones.RRHH)
+            directorio = os.path.join(carpeta, "bajas_adjuntos")
+            latencias, futuros = [], []
+            t_total = time.perf_counter()
+            for i, datos in enumerate(fotos):
+                t0 = time.perf_counter()
+                baja_id = _enviar(ruta_db, directorio, f"emp{i}", f"foto{i}.jpg", datos)
+                if modo == "síncrono":
+                    imagenes.procesar_baja(ruta_db, directorio, baja_id, args.max_px, args.calidad)
+                else:
+                    futuros.append(imagenes.encolar(ruta_db, directorio, baja_id, args.max_px, args.calidad))
+                latencias.append(time.perf_counter() - t0)
+            for f in futuros:
+                f.result()
+            t_total = time.perf_counter() - t_total
+            antes, despues = sum(map(len, fotos)), _ocupado(directorio)
+            db.cerrar_todas()
+        print(f"{modo:10s} envío medio {sum(latencias) / len(latencias) * 1000:7.1f} ms  "
+              f"máx {max(latencias) * 1000:7.1f} ms  todo procesado en {t_total:5.1f} s  "
+              f"disco {antes / 2**20:6.1f} MB -> {despues / 2**20:5.1f} MB ({despues / antes:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Coste de importación en frío de cada página.
+
+Para cada página de pages/ lee sus imports de nivel de módulo (los que se pagan
+al cargarla en cada worker, no los diferidos dentro de funciones) y los importa
+en un proceso Python limpio. Informa del tiempo, del RSS añadido sobre un
+intérprete vacío y de qué módulos pesados han quedado cargados.
+
+Con --limite-ms / --limite-mb termina con código 1 si alguna página los supera,
+para detectar regresiones (p. ej. volver a importar cv2 arriba del todo).
+
+    python bench/bench_imports.py [--limite-ms 3000] [--limite-mb 200]
+"""
+import argparse
+import ast
+import glob
+import json
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PESADOS = ["cv2", "av", "numpy", "streamlit_webrtc", "qrcode", "geopy"]
+
+SONDA = r"""
+import json, resource, sys, time
+sys.path[:0] = {rutas!r}
+rss0 = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+t0 = time.perf_counter()
+for m in {modulos!r}:
+    __import__(m)
+dt = time.perf_counter() - t0
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{"ms": dt * 1000, "mb": (rss - rss0) / 1024,
+                   "pesados": [p for p in {pesados!r} if p in sys.modules]}}))
+"""
+
+
+def imports_de_modulo(ruta: str) -> list[str]:
+    """Módulos importados en el nivel superior del fichero (ignora los imports dentro de funciones)."""
+    with open(ruta, encoding="utf-8") as f:
+        arbol = ast.parse(f.read())
+    modulos = []
+    for nodo in arbol.body:
+        if isinstance(nodo, ast.Import):
+            modulos += [a.name for a in nodo.names]
+        elif isinstance(nodo, ast.ImportFrom) and nodo.module and not nodo.level:
+            modulos.append(nodo.module)
+    return list(dict.fromkeys(modulos))
+
+
+def medir(modulos: list[str]) -> dict:
+    codigo = SONDA.format(rutas=[RAIZ, os.path.join(RAIZ, "pages")], modulos=modulos, pesados=PESADOS)
+    salida = subprocess.run([sys.executable, "-c", codigo], cwd=RAIZ, capture_output=True, text=True)
+    if salida.returncode:
+        return {"error": salida.stderr.strip().splitlines()[-1]}
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--limite-ms", type=float, help="fallar si una página tarda más en importar")
+    ap.add_argument("--limite-mb", type=float, help="fallar si una página añade más RSS")
+    args = ap.parse_args()
+
+    paginas = [os.path.join(RAIZ, "inicio.py")] + sorted(glob.glob(os.path.join(RAIZ, "pages", "*.py")))
+    fallos = 0
+    for ruta in paginas:
+        r = medir(imports_de_modulo(ruta))
+        nombre = os.path.relpath(ruta, RAIZ)
+        if "error" in r:
+            print(f"{nombre:<32} ERROR {r['error']}")
+            fallos += 1
+            continue
+        excede = (args.limite_ms and r["ms"] > args.limite_ms) or (args.limite_mb and r["mb"] > args.limite_mb)
+        fallos += bool(excede)
+        print(f"{nombre:<32} {r['ms']:8.0f} ms  {r['mb']:7.1f} MB RSS  "
+              f"pesados: {', '.join(r['pesados']) or '-'}{'   <-- supera el límite' if excede else ''}")
+    sys.exit(1 if fallos else 0)
+
+
+if __name__ == "__main__":
+    main()
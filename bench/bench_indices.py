@@ -0,0 +1,141 @@
+"""
+Benchmark de las consultas por empleado sobre un histórico de fichajes de varios años.
+
+Genera un fichajes.db sintético (empleados x años x días laborables x 4 marcas),
+y mide la vista semanal y el historial con:
+  - antes:   sin índices y filtro date(fecha_local) BETWEEN ? AND ?
+  - después: índices (empleado, fecha_local) y (empleado, id) y rango semiabierto
+Imprime el EXPLAIN QUERY PLAN de cada consulta para comprobar el uso de índices.
+
+    python bench/bench_indices.py --empleados 200 --anios 3
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import db
+
+ESQUEMA = """
+    CREATE TABLE IF NOT EXISTS fichajes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        empleado TEXT NOT NULL,
+        fecha_local TEXT NOT NULL,
+        fecha_utc   TEXT NOT NULL,
+        tipo TEXT NOT NULL CHECK (tipo IN ('Entrada','Salida')),
+        observaciones TEXT,
+        fuente TEXT DEFAULT 'movil',
+        created_at_utc TEXT DEFAULT (datetime('now'))
+    );
+"""
+INDICES = [
+    "CREATE INDEX IF NOT EXISTS idx_fichajes_empleado_fecha ON fichajes(empleado, fecha_local);",
+    "CREATE INDEX IF NOT EXISTS idx_fichajes_empleado_id    ON fichajes(empleado, id);",
+]
+
+SEMANA_ANTES = """
+    SELECT id, empleado, fecha_local, tipo, observaciones, fuente FROM fichajes
+    WHERE empleado = ? AND date(fecha_local) BETWEEN ? AND ?
+    ORDER BY fecha_local ASC, id ASC
+"""
+SEMANA_DESPUES = """
+    SELECT id, empleado, fecha_local, tipo, observaciones, fuente FROM fichajes
+    WHERE empleado = ? AND fecha_local >= ? AND fecha_local < ?
+    ORDER BY fecha_local ASC, id ASC
+"""
+HISTORIAL = """
+    SELECT empleado, fecha_local, tipo, observaciones FROM fichajes
+    WHERE empleado = ? ORDER BY id DESC LIMIT 200
+"""
+
+
+def generar(conn, empleados: int, anios: int):
+    """Inserta marcas en orden cronológico (como llegan en producción)."""
+    inicio = date(date.today().year - anios, 1, 1)
+    dias = (date.today() - inicio).days
+    filas = []
+    for n in range(dias):
+        d = inicio + timedelta(days=n)
+        if d.weekday() >= 5:
+            continue
+        for e in range(empleados):
+            for h_in, h_out in ((8, 14), (15, 18)):
+                e_dt = datetime.combine(d, datetime.min.time()) + timedelta(hours=h_in, minutes=random.randint(0, 20))
+                s_dt = datetime.combine(d, datetime.min.time()) + timedelta(hours=h_out, minutes=random.randint(0, 20))
+                for tipo, dt in (("Entrada", e_dt), ("Salida", s_dt)):
+                    txt = dt.strftime("%Y-%m-%d %H:%M:%S")
+                    filas.append((f"emp{e:04d}", txt, txt, tipo, ""))
+        if len(filas) > 50_000:
+            conn.executemany("INSERT INTO fichajes (empleado, fecha_local, fecha_utc, tipo, observaciones) "
+                             "VALUES (?, ?, ?, ?, ?)", filas)
+            filas.clear()
+    conn.executemany("INSERT INTO fichajes (empleado, fecha_local, fecha_utc, tipo, observaciones) "
+                     "VALUES (?, ?, ?, ?, ?)", filas)
+    conn.commit()
+
+
+def medir(conn, sql, params_fn, repeticiones: int) -> float:
+    t0 = time.perf_counter()
+    for i in range(repeticiones):
+        conn.execute(sql, params_fn(i)).fetchall()
+    return (time.perf_counter() - t0) / repeticiones * 1000
+
+
+def plan(conn, sql, params) -> str:
+    return " | ".join(r[-1] for r in conn.execute("EXPLAIN QUERY PLAN " + sql, params))
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--empleados", type=int, default=200)
+    ap.add_argument("--anios", type=int, default=3)
+    ap.add_argument("--repeticiones", type=int, default=50)
+    args = ap.parse_args()
+
+    lunes = date.today() - timedelta(days=date.today().weekday() + 7)
+    domingo = lunes + timedelta(days=6)
+
+    def p_antes(i):
+        return (f"emp{i % args.empleados:04d}", lunes.isoformat(), domingo.isoformat())
+
+    def p_despues(i):
+        return (f"emp{i % args.empleados:04d}", lunes.isoformat(), (domingo + timedelta(days=1)).isoformat())
+
+    def p_hist(i):
+        return (f"emp{i % args.empleados:04d}",)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = os.path.join(tmp, "fichajes.db")
+        conn = db.abrir(ruta)
+        conn.execute(ESQUEMA)
+        t0 = time.perf_counter()
+        generar(conn, args.empleados, args.anios)
+        total = conn.execute("SELECT COUNT(*) FROM fichajes").fetchone()[0]
+        print(f"{total} fichajes sintéticos generados en {time.perf_counter() - t0:.1f}s\n")
+
+        print("== antes (sin índices, date(fecha_local)) ==")
+        print("  plan semana:   ", plan(conn, SEMANA_ANTES, p_antes(0)))
+        print("  plan historial:", plan(conn, HISTORIAL, p_hist(0)))
+        print(f"  semana:    {medir(conn, SEMANA_ANTES, p_antes, args.repeticiones):8.2f} ms/consulta")
+        print(f"  historial: {medir(conn, HISTORIAL, p_hist, args.repeticiones):8.2f} ms/consulta")
+
+        for sql in INDICES:
+            conn.execute(sql)
+        conn.execute("ANALYZE;")
+        conn.commit()
+
+        print("\n== después (índices + rango semiabierto) ==")
+        print("  plan semana:   ", plan(conn, SEMANA_DESPUES, p_despues(0)))
+        print("  plan historial:", plan(conn, HISTORIAL, p_hist(0)))
+        print(f"  semana:    {medir(conn, SEMANA_DESPUES, p_despues, args.repeticiones):8.2f} ms/consulta")
+        print(f"  historial: {medir(conn, HISTORIAL, p_hist, args.repeticiones):8.2f} ms/consulta")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
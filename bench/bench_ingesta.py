@@ -0,0 +1,136 @@
+"""
+Generador de carga para el servicio de ingesta (ingesta.py).
+
+Arranca `python ingesta.py` en otro proceso sobre un fichajes.db temporal y
+lanza N clientes HTTP (conexión persistente, procesos aparte para no competir
+por el GIL con el servidor) que envían fichajes de uno en uno, como haría un
+kiosco. Informa de fichajes/s sostenidos y latencias p50/p99, con un commit por
+petición (--lote-filas 1 --lote-ms 0) y con group commit.
+
+    python bench/bench_ingesta.py [--clientes 32] [--segundos 10] [--lote-ms 20] [--lote-filas 500]
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+import ingesta
+
+HILOS_POR_PROCESO = 8
+
+
+def _cliente(puerto: int, n: int, hasta: float, latencias: list, errores: list):
+    conn = http.client.HTTPConnection("127.0.0.1", puerto)
+    i = 0
+    while time.time() < hasta:
+        cuerpo = json.dumps({"empleado": f"kiosco{n}-emp{i % 50}", "tipo": "Entrada" if i % 2 == 0 else "Salida",
+                             "clave": uuid.uuid4().hex})
+        t0 = time.perf_counter()
+        conn.request("POST", "/fichajes", cuerpo, {"Content-Type": "application/json"})
+        r = conn.getresponse()
+        r.read()
+        latencias.append(time.perf_counter() - t0)
+        if r.status != 200:
+            errores.append(r.status)
+        i += 1
+    conn.close()
+
+
+def _proceso(puerto: int, primero: int, hilos: int, hasta: float, salida):
+    latencias, errores = [], []
+    ts = [threading.Thread(target=_cliente, args=(puerto, primero + k, hasta, latencias, errores))
+          for k in range(hilos)]
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    salida.put((latencias, len(errores)))
+
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _get(puerto: int, ruta: str) -> dict:
+    conn = http.client.HTTPConnection("127.0.0.1", puerto, timeout=1)
+    conn.request("GET", ruta)
+    return json.loads(conn.getresponse().read())
+
+
+def _percentil(valores: list, p: float) -> float:
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))] if valores else float("nan")
+
+
+def medir(clientes: int, segundos: float, lote_ms: float, lote_filas: int) -> dict:
+    ruta = os.path.join(tempfile.mkdtemp(), "fichajes.db")
+    puerto = _puerto_libre()
+    servidor = subprocess.Popen([sys.executable, os.path.join(RAIZ, "ingesta.py"), ruta, "--puerto", str(puerto),
+                                 "--lote-ms", str(lote_ms), "--lote-filas", str(lote_filas)],
+                                stdout=subprocess.DEVNULL)
+    try:
+        for _ in range(100):
+            try:
+                _get(puerto, "/salud")
+                break
+            except OSError:
+                time.sleep(0.1)
+
+        salida = multiprocessing.Queue()
+        hasta = time.time() + segundos
+        procesos = []
+        for primero in range(0, clientes, HILOS_POR_PROCESO):
+            p = multiprocessing.Process(target=_proceso, args=(puerto, primero, min(HILOS_POR_PROCESO, clientes - primero),
+                                                                hasta, salida))
+            p.start()
+            procesos.append(p)
+        latencias, errores = [], 0
+        for _ in procesos:
+            lat, err = salida.get()
+            latencias += lat
+            errores += err
+        for p in procesos:
+            p.join()
+        transacciones = _get(puerto, "/salud")["transacciones"]
+    finally:
+        servidor.terminate()
+        servidor.wait()
+
+    with sqlite3.connect(ruta) as conn:
+        filas = conn.execute("SELECT COUNT(*) FROM fichajes").fetchone()[0]
+    return {"fichajes": filas, "por_s": filas / segundos, "p50": _percentil(latencias, 0.50),
+            "p99": _percentil(latencias, 0.99), "transacciones": transacciones, "errores": errores}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--clientes", type=int, default=32)
+    ap.add_argument("--segundos", type=float, default=10)
+    ap.add_argument("--lote-ms", type=float, default=ingesta.LOTE_MS)
+    ap.add_argument("--lote-filas", type=int, default=ingesta.LOTE_FILAS)
+    args = ap.parse_args()
+
+    for nombre, lote_ms, lote_filas in [("commit por petición", 0, 1),
+                                        (f"group commit ({args.lote_ms:g} ms / {args.lote_filas} filas)",
+                                         args.lote_ms, args.lote_filas)]:
+        r = medir(args.clientes, args.segundos, lote_ms, lote_filas)
+        print(f"{nombre:40s} {r['por_s']:8.0f} fichajes/s  p50 {r['p50'] * 1000:6.1f} ms  "
+              f"p99 {r['p99'] * 1000:6.1f} ms  {r['fichajes']} fichajes en {r['transacciones']} transacciones"
+              + (f"  {r['errores']} errores" if r["errores"] else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Comparativa de carga por fichaje entre los dos modos de validación del QR.
+
+  - video: el móvil emite VP8 por WebRTC mientras la página está abierta; el
+    servidor decodifica cada frame con av y lo pasa por qr.DetectorQR.
+  - foto:  el móvil sube una foto JPEG (st.camera_input); el servidor la
+    decodifica una sola vez con qr.leer_imagen.
+
+Para cada modo informa de la CPU del servidor y de los bytes recibidos por
+fichaje. La codificación (que hace el móvil) no se cuenta.
+
+    python bench/bench_modos_qr.py [--segundos 10] [--fps 30] [--kbps 600]
+"""
+import argparse
+import os
+import sys
+import time
+from fractions import Fraction
+
+import av
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import qr
+
+VALOR = "penades-fichaje-autorizado-2025"
+
+
+def escena(ancho: int, alto: int, i: int, rng) -> np.ndarray:
+    """Frame de cámara sintético con el QR de la oficina en el centro."""
+    codigo = cv2.QRCodeEncoder.create().encode(VALOR)
+    lado = alto // 2
+    codigo = cv2.resize(codigo, (lado, lado), interpolation=cv2.INTER_NEAREST)
+    codigo = cv2.copyMakeBorder(codigo, 16, 16, 16, 16, cv2.BORDER_CONSTANT, value=255)
+    img = cv2.GaussianBlur(rng.integers(90, 140, size=(alto, ancho, 3), dtype=np.uint8), (0, 0), 3)
+    h, w = codigo.shape
+    y, x = (alto - h) // 2 + (i % 3), (ancho - w) // 2 + (i % 4)
+    img[y:y + h, x:x + w] = codigo[:, :, None]
+    return img
+
+
+def codificar_video(frames: list, fps: int, kbps: int) -> list:
+    """Lo que haría el móvil: VP8 al bitrate de WebRTC. Devuelve los paquetes."""
+    ctx = av.CodecContext.create("libvpx", "w")
+    ctx.width, ctx.height = frames[0].shape[1], frames[0].shape[0]
+    ctx.pix_fmt = "yuv420p"
+    ctx.time_base = Fraction(1, fps)
+    ctx.bit_rate = kbps * 1000
+    paquetes = []
+    for i, img in enumerate(frames):
+        frame = av.VideoFrame.from_ndarray(img, format="bgr24")
+        frame.pts = i
+        paquetes += [bytes(p) for p in ctx.encode(frame)]
+    paquetes += [bytes(p) for p in ctx.encode(None)]
+    return paquetes
+
+
+def modo_video(paquetes: list, cada_n: int):
+    ctx = av.CodecContext.create("libvpx", "r")
+    detector = qr.DetectorQR(VALOR, cada_n_frames=cada_n)
+    cpu0 = time.process_time()
+    for datos in paquetes:
+        for frame in ctx.decode(av.Packet(datos)):
+            detector.procesar(frame.to_ndarray(format="bgr24"))
+    return time.process_time() - cpu0, sum(len(p) for p in paquetes), detector.enclavado
+
+
+def modo_foto(jpeg: bytes):
+    cpu0 = time.process_time()
+    ok = qr.leer_imagen(jpeg) == VALOR
+    return time.process_time() - cpu0, len(jpeg), ok
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--segundos", type=int, default=10, help="tiempo con la cámara abierta por fichaje")
+    ap.add_argument("--fps", type=int, default=30)
+    ap.add_argument("--kbps", type=int, default=600, help="bitrate del vídeo WebRTC")
+    ap.add_argument("--cada-n", type=int, default=5)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    frames = [escena(640, 480, i, rng) for i in range(args.segundos * args.fps)]
+    paquetes = codificar_video(frames, args.fps, args.kbps)
+    ok, jpeg = cv2.imencode(".jpg", escena(1280, 720, 0, rng), [cv2.IMWRITE_JPEG_QUALITY, 90])
+
+    cpu_v, bytes_v, det_v = modo_video(paquetes, args.cada_n)
+    cpu_f, bytes_f, det_f = modo_foto(jpeg.tobytes())
+
+    print(f"modo video: {args.segundos}s a {args.fps} fps 640x480, VP8 {args.kbps} kbps")
+    print(f"  CPU servidor {cpu_v * 1000:8.1f} ms/fichaje   recibido {bytes_v / 1024:8.1f} KiB   QR leído: {det_v}")
+    print("modo foto: una foto JPEG 1280x720")
+    print(f"  CPU servidor {cpu_f * 1000:8.1f} ms/fichaje   recibido {bytes_f / 1024:8.1f} KiB   QR leído: {det_f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark offline del lector de QR sobre frames grabados.
+
+Compara el lector anterior (cv2.QRCodeDetector nuevo y detectAndDecode a
+resolución completa en cada frame) con qr.DetectorQR (detector reutilizado,
+gris + reescalado, 1 de cada N frames, enclavado al leer el código).
+Informa del tiempo de CPU por frame y del tiempo hasta detectar el código.
+
+Frames de entrada: una carpeta de imágenes (ordenadas por nombre) o un vídeo.
+Sin --frames se generan frames sintéticos 1280x720: ruido de cámara y, a partir
+de la mitad, el QR de la oficina.
+
+    python bench/bench_qr.py [--frames carpeta_o_video] [--cada-n 5] [--fps 30]
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import qr
+
+VALOR = "penades-fichaje-autorizado-2025"
+
+
+def frames_sinteticos(n: int = 120, ancho: int = 1280, alto: int = 720) -> list:
+    rng = np.random.default_rng(0)
+    codigo = cv2.QRCodeEncoder.create().encode(VALOR)
+    codigo = cv2.resize(codigo, (300, 300), interpolation=cv2.INTER_NEAREST)
+    codigo = cv2.copyMakeBorder(codigo, 20, 20, 20, 20, cv2.BORDER_CONSTANT, value=255)
+    frames = []
+    for i in range(n):
+        img = rng.integers(90, 140, size=(alto, ancho, 3), dtype=np.uint8)
+        if i >= n // 2:
+            y, x = 160 + (i % 7), 480 + (i % 5)
+            h, w = codigo.shape
+            img[y:y + h, x:x + w] = codigo[:, :, None]
+        frames.append(img)
+    return frames
+
+
+def cargar_frames(origen: str) -> list:
+    if os.path.isdir(origen):
+        nombres = sorted(os.listdir(origen))
+        return [img for img in (cv2.imread(os.path.join(origen, n)) for n in nombres) if img is not None]
+    cap = cv2.VideoCapture(origen)
+    frames = []
+    while True:
+        ok, img = cap.read()
+        if not ok:
+            break
+        frames.append(img)
+    return frames
+
+
+def lector_anterior(img) -> str:
+    detector = cv2.QRCodeDetector()
+    data, _, _ = detector.detectAndDecode(img)
+    return data
+
+
+def ejecutar(nombre: str, frames: list, procesar, fps: float):
+    detectado = None
+    cpu0 = time.process_time()
+    for i, img in enumerate(frames):
+        data = procesar(img)
+        if data == VALOR and detectado is None:
+            detectado = i
+    cpu = time.process_time() - cpu0
+    ttd = f"frame {detectado} ({detectado / fps:.2f}s de vídeo)" if detectado is not None else "no detectado"
+    print(f"{nombre:<10} CPU {cpu / len(frames) * 1000:7.2f} ms/frame  ({cpu:5.2f}s total)   detección: {ttd}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--frames", help="carpeta de imágenes o fichero de vídeo")
+    ap.add_argument("--cada-n", type=int, default=5)
+    ap.add_argument("--ancho-max", type=int, default=640)
+    ap.add_argument("--fps", type=float, default=30.0, help="fps de la grabación (para el tiempo hasta detectar)")
+    args = ap.parse_args()
+
+    frames = cargar_frames(args.frames) if args.frames else frames_sinteticos()
+    print(f"{len(frames)} frames de {frames[0].shape[1]}x{frames[0].shape[0]}\n")
+
+    ejecutar("anterior", frames, lector_anterior, args.fps)
+    detector = qr.DetectorQR(VALOR, cada_n_frames=args.cada_n, ancho_max=args.ancho_max)
+    ejecutar("DetectorQR", frames, detector.procesar, args.fps)
+    print(f"{'':<10} decodificados {detector.decodificados} de {detector.frames} frames")
+
+
+if __name__ == "__main__":
+    main()
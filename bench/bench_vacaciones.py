@@ -0,0 +1,83 @@
+"""
+Consultas de vacaciones: SQL sobre la tabla frente al motor en memoria (vacaciones.py).
+
+Crea un rrhh.db temporal con `--solicitudes` solicitudes de `--usuarios`
+usuarios y mide, por consulta:
+  - solape de un rango nuevo con las solicitudes del usuario,
+  - días consumidos del año (antes: días naturales sumados en SQL),
+  - quién está fuera un día dado (equipo completo).
+
+    python bench/bench_vacaciones.py [--usuarios 2000] [--solicitudes 20000] [--consultas 5000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import db
+import migraciones
+import vacaciones
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--usuarios", type=int, default=2000)
+    ap.add_argument("--solicitudes", type=int, default=20000)
+    ap.add_argument("--consultas", type=int, default=5000)
+    args = ap.parse_args()
+
+    rnd = random.Random(0)
+    ruta = os.path.join(tempfile.mkdtemp(), "rrhh.db")
+    migraciones.migrar(ruta, migraciones.RRHH)
+    base = date(2025, 1, 1)
+    filas = []
+    for _ in range(args.solicitudes):
+        ini = base + timedelta(days=rnd.randrange(700))
+        fin = ini + timedelta(days=rnd.randrange(14))
+        filas.append((f"u{rnd.randrange(args.usuarios)}", ini.isoformat(), fin.isoformat(), (fin - ini).days + 1,
+                      rnd.choice(["Pendiente", "Aprobado", "Cancelado"])))
+    with db.conexion(ruta) as conn:
+        conn.executemany("INSERT INTO vacaciones(usuario, fecha_inicio, fecha_fin, dias, comentario, estado, fecha_solicitud) "
+                         "VALUES (?, ?, ?, ?, '', ?, '2025-01-01 00:00:00');", filas)
+
+    consultas = []
+    for _ in range(args.consultas):
+        ini = base + timedelta(days=rnd.randrange(700))
+        consultas.append((f"u{rnd.randrange(args.usuarios)}", ini, ini + timedelta(days=rnd.randrange(10))))
+
+    def sql(conn):
+        for u, ini, fin in consultas:
+            conn.execute("SELECT id FROM vacaciones WHERE usuario = ? AND estado IN ('Pendiente','Aprobado') "
+                         "AND fecha_inicio <= ? AND fecha_fin >= ? LIMIT 1;", (u, fin.isoformat(), ini.isoformat())).fetchone()
+            conn.execute("SELECT SUM(dias) FROM vacaciones WHERE usuario = ? AND estado IN ('Pendiente','Aprobado') "
+                         "AND substr(fecha_inicio, 1, 4) = ?;", (u, str(ini.year))).fetchone()
+            conn.execute("SELECT DISTINCT usuario FROM vacaciones WHERE estado IN ('Pendiente','Aprobado') "
+                         "AND fecha_inicio <= ? AND fecha_fin >= ?;", (ini.isoformat(), ini.isoformat())).fetchall()
+
+    with db.conexion(ruta) as conn:
+        t0 = time.perf_counter()
+        sql(conn)
+        t_sql = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    m = vacaciones.motor(ruta)
+    t_carga = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for u, ini, fin in consultas:
+        m.solapa(u, ini, fin)
+        m.consumidos(u, ini.year)
+        m.ausentes(ini)
+    t_motor = time.perf_counter() - t0
+
+    n = len(consultas)
+    print(f"{args.solicitudes} solicitudes, {args.usuarios} usuarios, {n} consultas (solape + saldo + ausentes)")
+    print(f"SQL sobre la tabla: {t_sql / n * 1e6:8.1f} µs/consulta")
+    print(f"motor en memoria:   {t_motor / n * 1e6:8.1f} µs/consulta  (carga inicial {t_carga * 1000:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
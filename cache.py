@@ -0,0 +1,104 @@
+# cache.py
+"""
+Caché en memoria del proceso, por usuario y con caducidad (TTL).
+
+A diferencia de st.cache_data, permite invalidar solo las entradas de un
+usuario: las funciones que escriben datos de un usuario llaman a
+`invalidar(usuario)` y el resto de usuarios conserva su caché.
+
+`compartida(nombre)` da la instancia común del proceso para un tipo de datos
+(historial y semana de fichajes, listas de ausencias...).
+"""
+import threading
+import time
+
+
+class CachePorUsuario:
+    def __init__(self, ttl_s: float, max_usuarios: int = 5000):
+        self.ttl_s = ttl_s
+        self.max_usuarios = max_usuarios
+        self._datos: dict[str, dict] = {}        # usuario -> {clave: (caduca, valor)}
+        # Solo para usuarios con cálculos en curso (se borran al acabar el último):
+        self._en_curso: dict[str, int] = {}      # usuario -> nº de cálculos en curso
+        self._generacion: dict[str, int] = {}    # usuario -> invalidaciones durante esos cálculos
+        self._lock = threading.Lock()
+
+    def obtener(self, usuario: str, clave, calcular):
+        """Devuelve el valor cacheado de (usuario, clave) o lo calcula con `calcular()`."""
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._datos.get(usuario, {}).get(clave)
+            if entrada is not None and entrada[0] > ahora:
+                return entrada[1]
+            generacion = self._generacion.get(usuario, 0)
+            self._en_curso[usuario] = self._en_curso.get(usuario, 0) + 1
+
+        try:
+            valor = calcular()
+        except BaseException:
+            with self._lock:
+                self._terminar(usuario)
+            raise
+
+        with self._lock:
+            # Si se invalidó mientras se calculaba, el valor puede estar obsoleto: no se guarda
+            if self._generacion.get(usuario, 0) == generacion:
+                if usuario not in self._datos and len(self._datos) >= self.max_usuarios:
+                    self._purgar(ahora)
+                self._datos.setdefault(usuario, {})[clave] = (ahora + self.ttl_s, valor)
+            self._terminar(usuario)
+        return valor
+
+    def _terminar(self, usuario: str):
+        """Fin de un cálculo; con el último de `usuario` su generación ya no hace falta."""
+        self._en_curso[usuario] -= 1
+        if not self._en_curso[usuario]:
+            del self._en_curso[usuario]
+            self._generacion.pop(usuario, None)
+
+    def _nueva_generacion(self, usuario: str):
+        # Sin cálculos en curso no hay valor obsoleto que descartar
+        if usuario in self._en_curso:
+            self._generacion[usuario] = self._generacion.get(usuario, 0) + 1
+
+    def invalidar(self, usuario: str):
+        with self._lock:
+            self._datos.pop(usuario, None)
+            self._nueva_generacion(usuario)
+
+    def limpiar(self):
+        with self._lock:
+            for usuario in self._en_curso:
+                self._nueva_generacion(usuario)
+            self._datos.clear()
+
+    def _purgar(self, ahora: float):
+        """Quita lo caducado y, si aún no hay sitio, los usuarios más antiguos."""
+        for usuario in [u for u, d in self._datos.items() if all(c <= ahora for c, _ in d.values())]:
+            del self._datos[usuario]
+        while len(self._datos) >= self.max_usuarios:
+            del self._datos[next(iter(self._datos))]
+
+
+# ======== Cachés compartidas del proceso ========
+# Viven en el módulo (no en la página), así que sobreviven a los reruns de Streamlit
+# y todas las páginas que leen o escriben los mismos datos usan la misma instancia.
+_compartidas: dict[str, CachePorUsuario] = {}
+_compartidas_lock = threading.Lock()
+
+
+def compartida(nombre: str, ttl_s: float = 300) -> CachePorUsuario:
+    """Caché por usuario con nombre `nombre` (p. ej. "fichajes", "rrhh"); se crea la primera vez."""
+    with _compartidas_lock:
+        c = _compartidas.get(nombre)
+        if c is None:
+            c = _compartidas[nombre] = CachePorUsuario(ttl_s=ttl_s)
+        return c
+
+
+def invalidar_usuario(usuario: str):
+    """Invalida las entradas de `usuario` en todas las cachés compartidas."""
+    with _compartidas_lock:
+        caches = list(_compartidas.values())
+    for c in caches:
+        c.invalidar(usuario)
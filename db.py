@@ -0,0 +1,80 @@
+# db.py
+"""
+Acceso compartido a las bases SQLite (fichajes.db, rrhh.db).
+
+Cada base tiene un pool de conexiones reutilizables. Una conexión se presta a un
+único hilo mientras dura el bloque `with conexion(ruta)` y vuelve al pool al
+salir, así que nunca la usan dos hilos a la vez. Todas se abren en modo WAL con
+synchronous=NORMAL, busy_timeout y caché de sentencias preparadas.
+"""
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+BUSY_TIMEOUT_MS   = 5000   # espera ante "database is locked" antes de fallar
+CACHED_STATEMENTS = 256    # sentencias preparadas que guarda cada conexión
+MAX_CONEXIONES    = 16     # conexiones ociosas que se conservan por base
+
+_pools: dict[str, queue.LifoQueue] = {}
+_pools_lock = threading.Lock()
+
+
+def abrir(ruta: str) -> sqlite3.Connection:
+    """Abre una conexión nueva con la configuración común (sin pool)."""
+    os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+    conn = sqlite3.connect(
+        ruta,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        check_same_thread=False,          # la exclusividad la garantiza el pool
+        cached_statements=CACHED_STATEMENTS,
+    )
+    conn.execute("PRAGMA journal_mode=WAL;")
+    conn.execute("PRAGMA synchronous=NORMAL;")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS};")
+    return conn
+
+
+def _pool(ruta: str) -> queue.LifoQueue:
+    clave = os.path.abspath(ruta)
+    with _pools_lock:
+        pool = _pools.get(clave)
+        if pool is None:
+            pool = _pools[clave] = queue.LifoQueue(maxsize=MAX_CONEXIONES)
+        return pool
+
+
+@contextmanager
+def conexion(ruta: str):
+    """
+    Presta una conexión del pool de `ruta`.
+    Al salir del bloque confirma la transacción (o la deshace si hubo excepción)
+    y devuelve la conexión al pool.
+    """
+    pool = _pool(ruta)
+    try:
+        conn = pool.get_nowait()
+    except queue.Empty:
+        conn = abrir(ruta)
+    try:
+        with conn:
+            yield conn
+    finally:
+        try:
+            pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+
+def cerrar_todas():
+    """Cierra las conexiones ociosas de todos los pools (tests, benchmarks, apagado)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        while True:
+            try:
+                pool.get_nowait().close()
+            except queue.Empty:
+                break
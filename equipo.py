@@ -0,0 +1,94 @@
+# equipo.py
+"""
+Calendario de ausencias de un equipo (subordinados directos según la columna
+`superior` de usuarios.csv).
+
+`ocupacion_mes` trae vacaciones (Pendiente/Aprobado) y bajas de todo el equipo
+para un mes con una sola consulta (UNION ALL, índices (usuario, fecha_inicio,
+fecha_fin)) y las expande con NumPy a una matriz día × empleado. El resultado
+se cachea por supervisor y (equipo, mes); cualquier cambio en las ausencias de
+un miembro llama a `invalidar(superior)`.
+
+Una baja sin fecha fin ocupa solo su día de inicio: la app no permite cerrarla
+después, así que tratarla como abierta la alargaría a todos los meses siguientes.
+"""
+import calendar
+from datetime import date
+
+import numpy as np
+
+import cache
+import db
+
+LIBRE, PENDIENTE, APROBADA, BAJA = 0, 1, 2, 3      # prioridad creciente si coinciden
+ETIQUETAS = {LIBRE: "", PENDIENTE: "🟡", APROBADA: "🟢", BAJA: "🔴"}
+TTL_S = 300
+
+_cache = cache.compartida("equipos", TTL_S)
+
+
+def subordinados(usuarios: dict, superior: str) -> list[str]:
+    """Usuarios cuyo `superior` es `superior`, en el orden de usuarios.csv."""
+    return [u for u, fila in usuarios.items() if fila.get("superior") == superior and u != superior]
+
+
+def _consultar(conn, miembros: list[str], ini: str, fin: str) -> list[tuple]:
+    marcas = ", ".join("?" * len(miembros))
+    return conn.execute(f"""
+        SELECT usuario, CASE estado WHEN 'Aprobado' THEN {APROBADA} ELSE {PENDIENTE} END, fecha_inicio, fecha_fin
+        FROM vacaciones
+        WHERE usuario IN ({marcas}) AND estado IN ('Pendiente', 'Aprobado')
+          AND fecha_inicio <= ? AND fecha_fin >= ?
+        UNION ALL
+        SELECT usuario, {BAJA}, fecha_inicio, IFNULL(fecha_fin, fecha_inicio)   -- sin fecha fin: un solo día
+        FROM bajas
+        WHERE usuario IN ({marcas})
+          AND fecha_inicio <= ? AND IFNULL(fecha_fin, fecha_inicio) >= ?;
+    """, [*miembros, fin, ini, *miembros, fin, ini]).fetchall()
+
+
+def _matriz(filas: list[tuple], miembros: list[str], primero: date, n_dias: int) -> np.ndarray:
+    """Matriz (n_dias × miembros) con el código de ausencia de más prioridad de cada día."""
+    matriz = np.zeros((n_dias, len(miembros)), dtype=np.int8)
+    if not filas:
+        return matriz
+    columna = {u: j for j, u in enumerate(miembros)}
+    usuarios, codigos, inicios, fines = zip(*filas)
+    cols = np.fromiter((columna[u] for u in usuarios), dtype=np.intp, count=len(filas))
+    codigos = np.asarray(codigos, dtype=np.int8)
+    base = np.datetime64(primero, "D")
+    ini = np.clip((np.array(inicios, dtype="datetime64[D]") - base).astype(np.intp), 0, n_dias - 1)
+    fin = np.clip((np.array(fines, dtype="datetime64[D]") - base).astype(np.intp), 0, n_dias - 1)
+    for codigo in (PENDIENTE, APROBADA, BAJA):
+        sel = codigos == codigo
+        if not sel.any():
+            continue
+        # Diferencias: +1 el primer día, -1 el día siguiente al último; la suma acumulada marca el rango
+        dif = np.zeros((n_dias + 1, len(miembros)), dtype=np.int32)
+        np.add.at(dif, (ini[sel], cols[sel]), 1)
+        np.add.at(dif, (fin[sel] + 1, cols[sel]), -1)
+        matriz[np.cumsum(dif[:-1], axis=0) > 0] = codigo
+    return matriz
+
+
+def ocupacion_mes(ruta: str, superior: str, miembros: list[str], anio: int, mes: int) -> tuple[list[date], np.ndarray]:
+    """(días del mes, matriz día × miembro con LIBRE/PENDIENTE/APROBADA/BAJA), cacheada."""
+    clave = (ruta, tuple(miembros), anio, mes)
+    return _cache.obtener(superior, clave, lambda: _ocupacion_mes(ruta, miembros, anio, mes))
+
+
+def _ocupacion_mes(ruta: str, miembros: list[str], anio: int, mes: int) -> tuple[list[date], np.ndarray]:
+    n_dias = calendar.monthrange(anio, mes)[1]
+    dias = [date(anio, mes, d) for d in range(1, n_dias + 1)]
+    if not miembros:
+        return dias, np.zeros((n_dias, 0), dtype=np.int8)
+    with db.conexion(ruta) as conn:
+        filas = _consultar(conn, miembros, dias[0].isoformat(), dias[-1].isoformat())
+    matriz = _matriz(filas, miembros, dias[0], n_dias)
+    matriz.setflags(write=False)    # compartida por todos los reruns: solo lectura
+    return dias, matriz
+
+
+def invalidar(superior: str | None):
+    if superior:
+        _cache.invalidar(superior)
@@ -0,0 +1,142 @@
+# exportacion.py
+"""
+Extractos para nóminas: fichajes en bruto u horas por día, en CSV o Parquet.
+
+Todo va en streaming y con memoria acotada, sea cual sea el rango:
+  - `leer_fichajes` recorre los fichajes del rango con `fetchmany` (LOTE filas
+    cada vez) en orden (empleado, fecha_local, id), que es el del índice
+    idx_fichajes_empleado_fecha, así que SQLite no ordena nada en memoria (si el
+    rango toca años archivados, archivado.lectura añade esos archivos con UNION ALL
+    y SQLite ordena con su sorter, que vuelca a disco);
+  - `horas_por_dia` agrupa ese flujo por (empleado, día) y aplica
+    `horas.emparejar_dia`, las mismas reglas que horas_diarias y la vista semanal;
+  - los escritores vuelcan cada bloque y lo sueltan: LOTE filas en CSV,
+    ESCRITURA filas (un row group) en Parquet.
+
+    python exportacion.py ruta/a/fichajes.db --mes 2026-09 --tipo horas --formato parquet --salida horas.parquet
+"""
+import argparse
+import csv
+import itertools
+from datetime import date, timedelta
+from typing import Iterable, Iterator
+
+import archivado
+import horas
+
+LOTE = 10_000           # filas por fetchmany
+ESCRITURA = 100_000     # filas por row group en Parquet (el CSV se escribe de LOTE en LOTE)
+TIPOS = ("fichajes", "horas")
+FORMATOS = ("csv", "parquet")
+COLUMNAS = {
+    "fichajes": ["id", "empleado", "fecha_local", "fecha_utc", "tipo", "observaciones", "sede", "fuente"],
+    "horas": ["empleado", "fecha", "marcas", "segundos", "horas", "incompleto"],
+}
+TIPOS_PARQUET = {"id": "int64", "segundos": "int64", "horas": "double", "incompleto": "bool"}   # el resto, string
+
+
+def leer_fichajes(conn, desde: date, hasta: date, empleados: list[str] | None = None,
+                  lote: int = LOTE, origen: str = "fichajes") -> Iterator[tuple]:
+    """
+    Fichajes con fecha_local en [desde, hasta], en orden (empleado, fecha_local, id).
+    `origen`: la tabla o el UNION ALL con años archivados que da archivado.lectura.
+    """
+    condiciones = ["fecha_local >= ?", "fecha_local < ?"]
+    params = [desde.strftime("%Y-%m-%d"), (hasta + timedelta(days=1)).strftime("%Y-%m-%d")]
+    if empleados:
+        condiciones.append(f"empleado IN ({', '.join('?' * len(empleados))})")
+        params += empleados
+    cur = conn.execute(
+        f"SELECT {', '.join(COLUMNAS['fichajes'])} FROM {origen} "
+        f"WHERE {' AND '.join(condiciones)} ORDER BY empleado, fecha_local, id;", params
+    )
+    try:
+        while filas := cur.fetchmany(lote):
+            yield from filas
+    finally:
+        cur.close()
+
+
+def horas_por_dia(fichajes: Iterable[tuple]) -> Iterator[tuple]:
+    """
+    (empleado, fecha, marcas, segundos, horas, incompleto) por cada día con marcas, a partir
+    de filas de `leer_fichajes`. Solo retiene en memoria las marcas del día en curso.
+    """
+    for (empleado, dia), grupo in itertools.groupby(fichajes, key=lambda r: (r[1], r[2][:10])):
+        marcas, segundos, incompleto = horas.emparejar_dia((r[4], r[2]) for r in grupo)
+        yield empleado, dia, horas.SEPARADOR_MARCAS.join(marcas), segundos, round(segundos / 3600.0, 2), incompleto
+
+
+def _bloques(filas: Iterable[tuple], n: int) -> Iterator[list[tuple]]:
+    it = iter(filas)
+    while bloque := list(itertools.islice(it, n)):
+        yield bloque
+
+
+def escribir_csv(filas: Iterable[tuple], columnas: list[str], salida: str) -> int:
+    total = 0
+    with open(salida, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(columnas)
+        for bloque in _bloques(filas, LOTE):
+            w.writerows(bloque)
+            total += len(bloque)
+    return total
+
+
+def escribir_parquet(filas: Iterable[tuple], columnas: list[str], salida: str) -> int:
+    # pyarrow llega como dependencia de streamlit; solo hace falta para este formato
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    esquema = pa.schema([(c, pa.type_for_alias(TIPOS_PARQUET.get(c, "string"))) for c in columnas])
+    total = 0
+    with pq.ParquetWriter(salida, esquema) as escritor:
+        for bloque in _bloques(filas, ESCRITURA):
+            escritor.write_table(pa.Table.from_arrays(
+                [pa.array(c, type=f.type) for c, f in zip(zip(*bloque), esquema)], schema=esquema
+            ))
+            total += len(bloque)
+    return total
+
+
+def exportar(ruta: str, salida: str, desde: date, hasta: date, tipo: str = "horas", formato: str = "csv",
+             empleados: list[str] | None = None) -> int:
+    """Escribe el extracto `tipo` de fichajes.db en `salida` y devuelve las filas escritas."""
+    if tipo not in TIPOS or formato not in FORMATOS:
+        raise ValueError(f"tipo debe ser uno de {TIPOS} y formato uno de {FORMATOS}")
+    escribir = escribir_parquet if formato == "parquet" else escribir_csv
+    with archivado.lectura(ruta, "fichajes", desde, hasta) as (conn, origen):
+        filas = leer_fichajes(conn, desde, hasta, empleados, origen=origen)
+        if tipo == "horas":
+            filas = horas_por_dia(filas)
+        return escribir(filas, COLUMNAS[tipo], salida)
+
+
+def _mes(texto: str) -> tuple[date, date]:
+    anio, mes = (int(p) for p in texto.split("-"))
+    siguiente = date(anio + mes // 12, mes % 12 + 1, 1)
+    return date(anio, mes, 1), siguiente - timedelta(days=1)
+
+
+if __name__ == "__main__":
+    import migraciones
+
+    ap = argparse.ArgumentParser(description="Exporta fichajes u horas por día a CSV o Parquet.")
+    ap.add_argument("ruta", help="ruta de fichajes.db")
+    ap.add_argument("--mes", help="YYYY-MM (alternativa a --desde/--hasta)")
+    ap.add_argument("--desde", type=date.fromisoformat)
+    ap.add_argument("--hasta", type=date.fromisoformat)
+    ap.add_argument("--tipo", choices=TIPOS, default="horas")
+    ap.add_argument("--formato", choices=FORMATOS, default="csv")
+    ap.add_argument("--empleado", action="append", dest="empleados", help="solo este empleado (repetible)")
+    ap.add_argument("--salida", required=True)
+    args = ap.parse_args()
+
+    if args.mes:
+        args.desde, args.hasta = _mes(args.mes)
+    if not (args.desde and args.hasta):
+        ap.error("indica --mes o --desde y --hasta")
+    migraciones.migrar(args.ruta, migraciones.FICHAJES)
+    n = exportar(args.ruta, args.salida, args.desde, args.hasta, args.tipo, args.formato, args.empleados)
+    print(f"{args.tipo}: {n} filas en {args.salida}")
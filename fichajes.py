@@ -0,0 +1,134 @@
+# fichajes.py
+"""
+Alta de fichajes en fichajes.db, independiente de la interfaz.
+
+Un fichaje es un dict con empleado, tipo ('Entrada'/'Salida'), fecha_local,
+fecha_utc, observaciones, fuente, sede y clave. La `clave` de idempotencia la
+genera el cliente al pulsar: si un lote se reenvía (reconexión, reintento tras
+un error) los fichajes ya guardados se ignoran en lugar de duplicarse.
+
+`insertar_lote` valida y guarda cualquier número de fichajes en una sola
+transacción con executemany, y actualiza horas_diarias de los días afectados.
+Las lecturas por empleado (historial, semana) se cachean en `lecturas` con
+`leer_cacheado`, que añade a la clave el último id de fichaje del empleado: un
+fichaje nuevo, lo escriba este proceso u otro (ingesta.py), cambia la clave y la
+siguiente lectura va a la base. Quien escribe en este proceso llama además a
+`invalidar_lecturas` para soltar las entradas viejas sin esperar al TTL.
+"""
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import cache
+import db
+import horas
+
+TABLA = "fichajes"
+TIPOS = ("Entrada", "Salida")
+FORMATO = "%Y-%m-%d %H:%M:%S"
+
+# Ventana aceptada para la hora original de un fichaje diferido
+MAX_ANTIGUEDAD = timedelta(days=7)
+MAX_ADELANTO = timedelta(minutes=5)
+
+TTL_LECTURAS_S = 300   # las entradas de versiones anteriores se liberan a lo sumo a este plazo
+lecturas = cache.compartida("fichajes", TTL_LECTURAS_S)
+
+
+class FichajeInvalido(ValueError):
+    pass
+
+
+def local_a_utc(dt_local: datetime) -> str:
+    """Convierte un datetime 'naive' local a cadena UTC 'YYYY-MM-DD HH:MM:SS' sin libs externas."""
+    # offset local = now_local - now_utc (aprox, válido para España con cambio horario)
+    offset = datetime.now() - datetime.utcnow()
+    return (dt_local - offset).strftime(FORMATO)
+
+
+def nuevo(empleado: str, tipo: str, observaciones: str = "", sede: str | None = None,
+          fuente: str = "movil") -> dict:
+    """Fichaje con el instante real de pulsación y una clave de idempotencia nueva."""
+    return {
+        "empleado": empleado,
+        "fecha_local": datetime.now().strftime(FORMATO),
+        "fecha_utc": datetime.now(timezone.utc).strftime(FORMATO),
+        "tipo": tipo,
+        "observaciones": observaciones or "",
+        "fuente": fuente,
+        "sede": sede,
+        "clave": uuid.uuid4().hex,
+    }
+
+
+def validar(registro: dict, ahora: datetime | None = None) -> dict:
+    """Comprueba y normaliza un fichaje recibido. Lanza FichajeInvalido si no es aceptable."""
+    ahora = ahora or datetime.now()
+    empleado = str(registro.get("empleado") or "").strip()
+    if not empleado:
+        raise FichajeInvalido("Falta el empleado.")
+    tipo = registro.get("tipo")
+    if tipo not in TIPOS:
+        raise FichajeInvalido(f"Tipo de fichaje no válido: {tipo!r}.")
+    try:
+        dt_local = datetime.strptime(str(registro.get("fecha_local")), FORMATO)
+    except ValueError:
+        raise FichajeInvalido(f"fecha_local debe tener formato 'YYYY-MM-DD HH:MM:SS': {registro.get('fecha_local')!r}.")
+    if dt_local > ahora + MAX_ADELANTO or dt_local < ahora - MAX_ANTIGUEDAD:
+        raise FichajeInvalido(f"fecha_local fuera de la ventana admitida: {registro['fecha_local']}.")
+    clave = registro.get("clave")
+    return {
+        "empleado": empleado,
+        "fecha_local": dt_local.strftime(FORMATO),
+        "fecha_utc": registro.get("fecha_utc") or local_a_utc(dt_local),
+        "tipo": tipo,
+        "observaciones": registro.get("observaciones") or "",
+        "fuente": registro.get("fuente") or "movil",
+        "sede": registro.get("sede"),
+        "clave": str(clave) if clave else None,
+    }
+
+
+def insertar_validados(conn, filas: list[dict]) -> int:
+    """Inserta filas ya devueltas por `validar` (INSERT OR IGNORE por clave). Devuelve las insertadas."""
+    if not filas:
+        return 0
+    return conn.executemany(
+        f"INSERT OR IGNORE INTO {TABLA} (empleado, fecha_local, fecha_utc, tipo, observaciones, fuente, sede, clave) "
+        "VALUES (:empleado, :fecha_local, :fecha_utc, :tipo, :observaciones, :fuente, :sede, :clave);",
+        filas
+    ).rowcount
+
+
+def recalcular_dias(conn, filas: list[dict]):
+    """Actualiza horas_diarias una vez por cada (empleado, día) presente en `filas`."""
+    for empleado, dia in sorted({(f["empleado"], f["fecha_local"][:10]) for f in filas}):
+        horas.recalcular_dia(conn, empleado, datetime.strptime(dia, "%Y-%m-%d").date())
+
+
+def insertar_lote(conn, registros: list[dict]) -> tuple[int, int]:
+    """
+    Valida e inserta los fichajes en la transacción de `conn` (INSERT OR IGNORE por clave).
+    Devuelve (insertados, duplicados). Si alguno no es válido no se inserta ninguno.
+    """
+    filas = [validar(r) for r in registros]
+    insertados = insertar_validados(conn, filas)
+    recalcular_dias(conn, filas)
+    return insertados, len(filas) - insertados
+
+
+def version(conn, empleado: str) -> int:
+    """Último id de fichaje del empleado (búsqueda en el índice (empleado, id))."""
+    return conn.execute(f"SELECT IFNULL(MAX(id), 0) FROM {TABLA} WHERE empleado = ?;", (empleado,)).fetchone()[0]
+
+
+def leer_cacheado(ruta: str, empleado: str, clave: tuple, calcular):
+    """Lectura de `empleado` cacheada en `lecturas` mientras no tenga fichajes nuevos en `ruta`."""
+    with db.conexion(ruta) as conn:
+        v = version(conn, empleado)
+    return lecturas.obtener(empleado, (*clave, v), calcular)
+
+
+def invalidar_lecturas(empleados):
+    """Invalida las lecturas cacheadas de esos empleados (llamar después del commit)."""
+    for empleado in set(empleados):
+        lecturas.invalidar(empleado)
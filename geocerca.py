@@ -0,0 +1,85 @@
+# geocerca.py
+"""
+Geocerca de sedes: ¿está el usuario dentro del radio de alguna oficina?
+
+Las sedes vienen de configuración (secrets `sedes`, ver `desde_config`). Para
+cada posición:
+  1. descarta las sedes cuyo recuadro (bounding box) no contiene el punto,
+  2. calcula la distancia haversine (barata) a las que quedan,
+  3. solo si el punto está cerca del borde del radio confirma con geopy.geodesic.
+
+`sede_en_sesion` guarda el resultado en un dict de sesión y no recalcula
+mientras la posición no se mueva más de `umbral_m` metros.
+"""
+import math
+from typing import NamedTuple
+
+import geopy.distance
+
+R_TIERRA_M = 6371008.8
+MARGEN_HAVERSINE = 0.006   # error relativo máximo de haversine frente al elipsoide (<0,5 %)
+
+# Oficina de Almansa, Albacete (valor por defecto si no hay `sedes` en secrets)
+SEDES_POR_DEFECTO = [{"nombre": "Almansa", "lat": 38.85019, "lon": -1.02822, "radio_m": 500}]
+
+
+class Sede(NamedTuple):
+    nombre: str
+    lat: float
+    lon: float
+    radio_m: float
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * R_TIERRA_M * math.asin(math.sqrt(a))
+
+
+class Geocerca:
+    def __init__(self, sedes: list[Sede]):
+        self.sedes = list(sedes)
+        # Recuadro de cada sede en grados (con margen), precalculado una vez
+        self._cajas = []
+        for s in self.sedes:
+            dlat = math.degrees(s.radio_m * (1 + MARGEN_HAVERSINE) / R_TIERRA_M)
+            dlon = dlat / max(math.cos(math.radians(s.lat)), 1e-6)
+            self._cajas.append((s.lat - dlat, s.lat + dlat, s.lon - dlon, s.lon + dlon))
+
+    @classmethod
+    def desde_config(cls, sedes: list[dict] | None = None) -> "Geocerca":
+        """`sedes`: lista de {nombre, lat, lon, radio_m}; si no se indica, la oficina por defecto."""
+        return cls([Sede(str(s["nombre"]), float(s["lat"]), float(s["lon"]), float(s.get("radio_m", 500)))
+                    for s in (sedes or SEDES_POR_DEFECTO)])
+
+    def sede_cercana(self, lat: float, lon: float) -> tuple[Sede | None, float | None]:
+        """Sede más cercana cuyo radio contiene el punto, y su distancia en metros; (None, None) si ninguna."""
+        mejor, mejor_d = None, None
+        for s, (la0, la1, lo0, lo1) in zip(self.sedes, self._cajas):
+            if not (la0 <= lat <= la1 and lo0 <= lon <= lo1):
+                continue
+            d = haversine_m(s.lat, s.lon, lat, lon)
+            if d > s.radio_m * (1 + MARGEN_HAVERSINE):
+                continue
+            if d >= s.radio_m * (1 - MARGEN_HAVERSINE):
+                # Zona dudosa junto al borde: distancia exacta sobre el elipsoide
+                d = geopy.distance.geodesic((s.lat, s.lon), (lat, lon)).m
+                if d > s.radio_m:
+                    continue
+            if mejor_d is None or d < mejor_d:
+                mejor, mejor_d = s, d
+        return mejor, mejor_d
+
+
+def sede_en_sesion(estado: dict, geocerca: Geocerca, lat: float, lon: float, umbral_m: float = 25) -> Sede | None:
+    """
+    Como `geocerca.sede_cercana` pero cacheado en `estado` (p. ej. st.session_state):
+    mientras la posición no se mueva más de `umbral_m` se devuelve el resultado anterior.
+    """
+    previo = estado.get("_geocerca")
+    if previo and haversine_m(previo["lat"], previo["lon"], lat, lon) < umbral_m:
+        return previo["sede"]
+    sede, _ = geocerca.sede_cercana(lat, lon)
+    estado["_geocerca"] = {"lat": lat, "lon": lon, "sede": sede}
+    return sede
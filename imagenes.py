@@ -0,0 +1,110 @@
+# imagenes.py
+"""
+Reducción de las fotos adjuntas a bajas/permisos, en segundo plano.
+
+Las fotos de documentos hechas con el móvil llegan a resolución de cámara
+(4-8 MB). Tras registrar la baja, `encolar` manda sus adjuntos JPG/PNG a un
+pool de hilos que, para cada uno:
+  1. lo gira según EXIF y lo reduce a `max_px` de lado mayor (JPEG `calidad`),
+  2. genera una miniatura de `MINIATURA_PX` para el listado,
+  3. guarda ambos en el almacén de adjuntos, apunta la fila de bajas_adjuntos
+     a la versión reducida y borra el original si ya nadie lo usa.
+Si la versión reducida no ocupa menos que el original se conserva el original
+(solo se añade la miniatura). El envío del formulario no espera a nada de esto.
+"""
+import contextlib
+import io
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from PIL import Image, ImageOps
+
+import adjuntos
+import cache
+import db
+
+EXTENSIONES = (".jpg", ".jpeg", ".png")
+MAX_PX = 2000
+CALIDAD = 80
+MINIATURA_PX = 160
+TRABAJADORES = 2
+
+_pool: ThreadPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def es_imagen(nombre: str) -> bool:
+    return nombre.lower().endswith(EXTENSIONES)
+
+
+def _jpeg(img: Image.Image, calidad: int) -> bytes:
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", quality=calidad, optimize=True, progressive=True)
+    return buf.getvalue()
+
+
+def reducir(datos: bytes, max_px: int = MAX_PX, calidad: int = CALIDAD) -> tuple[bytes, bytes]:
+    """(imagen reducida en JPEG, miniatura en JPEG) a partir de los bytes originales."""
+    with Image.open(io.BytesIO(datos)) as img:
+        img.draft("RGB", (max_px, max_px))   # JPEG: decodifica ya a escala reducida
+        img = ImageOps.exif_transpose(img)
+        if img.mode != "RGB":
+            fondo = Image.new("RGB", img.size, "white")   # PNG con transparencia: fondo blanco
+            fondo.paste(img, mask=img.getchannel("A") if "A" in img.getbands() else None)
+            img = fondo
+        img.thumbnail((max_px, max_px), Image.LANCZOS)
+        reducida = _jpeg(img, calidad)
+        img.thumbnail((MINIATURA_PX, MINIATURA_PX), Image.LANCZOS)
+        return reducida, _jpeg(img, 70)
+
+
+def procesar_baja(ruta_db: str, directorio: str, baja_id: int, max_px: int = MAX_PX, calidad: int = CALIDAD) -> int:
+    """Reduce las imágenes pendientes (sin miniatura) de la baja. Devuelve cuántas ha procesado."""
+    with db.conexion(ruta_db) as conn:
+        pendientes = conn.execute(
+            f"SELECT id, usuario, nombre, ruta, tamano, sha256 FROM {adjuntos.TABLA} "
+            "WHERE baja_id = ? AND miniatura IS NULL;", (baja_id,)
+        ).fetchall()
+    hechas, usuarios = 0, set()
+    for id_, usuario, nombre, ruta, tamano, sha256 in pendientes:
+        if not es_imagen(nombre):
+            continue
+        try:
+            with open(ruta, "rb") as f:
+                reducida, miniatura = reducir(f.read(), max_px, calidad)
+        except (OSError, ValueError, Image.DecompressionBombError):
+            continue   # archivo ausente o imagen ilegible: se deja tal cual
+        _, ruta_min = adjuntos.guardar_bytes(directorio, miniatura)
+        if len(reducida) < (tamano or 0):
+            sha_nuevo, ruta_nueva = adjuntos.guardar_bytes(directorio, reducida)
+            nombre_nuevo, tamano_nuevo = os.path.splitext(nombre)[0] + ".jpg", len(reducida)
+        else:
+            sha_nuevo, ruta_nueva, nombre_nuevo, tamano_nuevo = sha256, ruta, nombre, tamano
+        with db.conexion(ruta_db) as conn:
+            # BEGIN IMMEDIATE: nadie puede registrar el original mientras se comprueba si sigue en uso
+            conn.execute("BEGIN IMMEDIATE;")
+            conn.execute(
+                # sha256 del contenido que queda: la deduplicación y la cuota (adjuntos.uso_usuario) se basan en él
+                f"UPDATE {adjuntos.TABLA} SET ruta = ?, nombre = ?, tamano = ?, sha256 = ?, miniatura = ? WHERE id = ?;",
+                (ruta_nueva, nombre_nuevo, tamano_nuevo, sha_nuevo, ruta_min, id_)
+            )
+            en_uso = conn.execute(f"SELECT 1 FROM {adjuntos.TABLA} WHERE ruta = ? LIMIT 1;", (ruta,)).fetchone()
+            if ruta_nueva != ruta and not en_uso and ruta.startswith(os.path.join(directorio, "objetos")):
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(ruta)
+        hechas += 1
+        usuarios.add(usuario)
+    listas = cache.compartida("rrhh")
+    for usuario in usuarios:
+        listas.invalidar(usuario)
+    return hechas
+
+
+def encolar(ruta_db: str, directorio: str, baja_id: int, max_px: int = MAX_PX, calidad: int = CALIDAD) -> Future:
+    """Programa `procesar_baja` en el pool de hilos y vuelve enseguida."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=TRABAJADORES, thread_name_prefix="imagenes")
+    return _pool.submit(procesar_baja, ruta_db, directorio, baja_id, max_px, calidad)
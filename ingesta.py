@@ -0,0 +1,235 @@
+# ingesta.py
+"""
+Servicio HTTP local de ingesta de fichajes (kioscos, lectores de tarjetas),
+sin pasar por Streamlit. Solo usa la librería estándar.
+
+    python ingesta.py ruta/a/fichajes.db [--puerto 8510] [--lote-ms 20] [--lote-filas 500]
+
+  POST /fichajes   cuerpo JSON: un fichaje o una lista de fichajes
+                   {"empleado", "tipo", "fecha_local"?, "observaciones"?, "sede"?, "clave"?}
+                   -> 200 {"insertados": n, "duplicados": m}
+                   -> 400 si alguno no es válido (no se guarda ninguno de la petición)
+                   -> 400 / 413 si Content-Length no es válido o pasa de MAX_CUERPO
+  GET  /salud      -> 200 {"ok": true, "transacciones": n}
+
+La validación y el esquema son los de fichajes.py / migraciones.py. Las
+peticiones se validan en su propio hilo y se entregan a un único hilo escritor
+que hace group commit: junta lo que ya está en cola y, si hay más peticiones
+en curso, espera hasta `lote_ms` milisegundos (o hasta `lote_filas` filas) a
+que lleguen; después lo guarda todo en una sola transacción. Cada petición
+recibe respuesta cuando su transacción está confirmada.
+"""
+import json
+import queue
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import db
+import fichajes
+import migraciones
+
+PUERTO = 8510
+LOTE_MS = 20
+LOTE_FILAS = 500
+MAX_CUERPO = 1 << 20   # bytes por petición
+
+
+class _Pendiente:
+    __slots__ = ("filas", "insertados", "error", "hecho")
+
+    def __init__(self, filas: list[dict]):
+        self.filas = filas
+        self.insertados = 0
+        self.error = None
+        self.hecho = threading.Event()
+
+
+class EscritorAgrupado:
+    """Hilo escritor con group commit sobre la base `ruta`."""
+
+    def __init__(self, ruta: str, lote_ms: float = LOTE_MS, lote_filas: int = LOTE_FILAS):
+        self.ruta = ruta
+        self.lote_s = lote_ms / 1000
+        self.lote_filas = lote_filas
+        self.transacciones = 0
+        self._en_curso = 0
+        self._lock = threading.Lock()
+        self._cola: queue.Queue = queue.Queue()
+        self._hilo = threading.Thread(target=self._bucle, name="ingesta-escritor", daemon=True)
+        self._hilo.start()
+
+    def enviar(self, filas: list[dict]) -> int:
+        """Encola filas ya validadas y espera a que se confirmen. Devuelve las insertadas (no duplicadas)."""
+        pendiente = _Pendiente(filas)
+        self._cola.put(pendiente)
+        pendiente.hecho.wait()
+        if pendiente.error is not None:
+            raise pendiente.error
+        return pendiente.insertados
+
+    def cerrar(self):
+        self._cola.put(None)
+        self._hilo.join()
+
+    @contextmanager
+    def peticion(self):
+        """Marca una petición en curso: mientras haya más en curso que en el grupo, compensa esperar."""
+        with self._lock:
+            self._en_curso += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._en_curso -= 1
+
+    def _bucle(self):
+        while True:
+            primero = self._cola.get()
+            if primero is None:
+                return
+            grupo, n, fin = [primero], len(primero.filas), False
+            limite = time.monotonic() + self.lote_s
+            while n < self.lote_filas:
+                try:
+                    siguiente = self._cola.get_nowait()
+                except queue.Empty:
+                    # Cola vacía: solo se espera (hasta `lote_ms`) si hay otras peticiones a punto de llegar
+                    resto = limite - time.monotonic()
+                    if resto <= 0 or self._en_curso <= len(grupo):
+                        break
+                    try:
+                        siguiente = self._cola.get(timeout=min(resto, 0.001))
+                    except queue.Empty:
+                        continue
+                if siguiente is None:
+                    fin = True
+                    break
+                grupo.append(siguiente)
+                n += len(siguiente.filas)
+            self._escribir(grupo)
+            if fin:
+                return
+
+    def _escribir(self, grupo: list[_Pendiente]):
+        try:
+            with db.conexion(self.ruta) as conn:
+                for p in grupo:
+                    p.insertados = fichajes.insertar_validados(conn, p.filas)
+                fichajes.recalcular_dias(conn, [f for p in grupo for f in p.filas])
+            self.transacciones += 1
+            # Sin invalidar cachés: las páginas corren en otro proceso y detectan los fichajes
+            # nuevos por su versión (fichajes.leer_cacheado)
+        except Exception as e:
+            for p in grupo:
+                p.error = e
+        for p in grupo:
+            p.hecho.set()
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # conexiones persistentes
+    disable_nagle_algorithm = True  # cabeceras y cuerpo salen en escrituras separadas: sin esto, +40 ms por ACK retardado
+    server: "ServidorIngesta"
+
+    def _responder(self, estado: int, cuerpo: dict):
+        datos = json.dumps(cuerpo).encode("utf-8")
+        self.send_response(estado)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def do_GET(self):
+        if self.path == "/salud":
+            self._responder(200, {"ok": True, "transacciones": self.server.escritor.transacciones})
+        else:
+            self._responder(404, {"error": "no encontrado"})
+
+    def do_POST(self):
+        if self.path != "/fichajes":
+            self._responder(404, {"error": "no encontrado"})
+            return
+        with self.server.escritor.peticion():
+            self._fichajes()
+
+    def _fichajes(self):
+        try:
+            longitud = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            longitud = -1
+        if not 0 <= longitud <= MAX_CUERPO:
+            # El cuerpo no se lee: se cierra la conexión para que no pase por la petición siguiente
+            self.close_connection = True
+            if longitud < 0:
+                self._responder(400, {"error": "Content-Length no válido"})
+            else:
+                self._responder(413, {"error": "petición demasiado grande"})
+            return
+        try:
+            datos = json.loads(self.rfile.read(longitud) or b"null")
+            registros = datos if isinstance(datos, list) else [datos]
+            filas = []
+            for r in registros:
+                if not isinstance(r, dict):
+                    raise fichajes.FichajeInvalido("Cada fichaje debe ser un objeto JSON.")
+                r = dict(r)
+                r.setdefault("fuente", "kiosco")
+                # Un terminal sin reloj fiable puede omitir la hora: se usa la de llegada
+                r.setdefault("fecha_local", time.strftime(fichajes.FORMATO))
+                filas.append(fichajes.validar(r))
+        except (ValueError, fichajes.FichajeInvalido) as e:
+            self._responder(400, {"error": str(e)})
+            return
+        for f in filas:
+            f["clave"] = f["clave"] or uuid.uuid4().hex
+        try:
+            insertados = self.server.escritor.enviar(filas)
+        except Exception as e:
+            self._responder(503, {"error": f"no se pudo guardar: {e}"})
+            return
+        self._responder(200, {"insertados": insertados, "duplicados": len(filas) - insertados})
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class ServidorIngesta(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128   # muchos kioscos conectando a la vez
+
+    def __init__(self, ruta: str, host: str = "127.0.0.1", puerto: int = PUERTO,
+                 lote_ms: float = LOTE_MS, lote_filas: int = LOTE_FILAS, verbose: bool = False):
+        migraciones.migrar(ruta, migraciones.FICHAJES)
+        self.escritor = EscritorAgrupado(ruta, lote_ms, lote_filas)
+        self.verbose = verbose
+        super().__init__((host, puerto), _Manejador)
+
+    def server_close(self):
+        super().server_close()
+        self.escritor.cerrar()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Servicio HTTP local de ingesta de fichajes.")
+    ap.add_argument("ruta", help="ruta de fichajes.db")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--puerto", type=int, default=PUERTO)
+    ap.add_argument("--lote-ms", type=float, default=LOTE_MS, help="espera máxima para agrupar un commit")
+    ap.add_argument("--lote-filas", type=int, default=LOTE_FILAS, help="filas que fuerzan el commit")
+    ap.add_argument("-v", "--verbose", action="store_true", help="registra cada petición")
+    args = ap.parse_args()
+
+    servidor = ServidorIngesta(args.ruta, args.host, args.puerto, args.lote_ms, args.lote_filas, args.verbose)
+    print(f"Ingesta de fichajes en http://{args.host}:{args.puerto}/fichajes -> {args.ruta}")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
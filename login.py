@@ -3,16 +3,25 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime
 from streamlit_cookies_controller import CookieController 
-import geopy.distance
 from streamlit_geolocation import streamlit_geolocation
+import geocerca
+import migraciones
+import notificaciones
 
 # Option 1: Use double backslashes
 LOGO_PATH = "C:\\FichajesMovil\\assets\\logo_penades.webp"
 
 
 
-# Coordenadas de la oficina de Almansa, Albacete
-OFFICE_COORD = (38.85019, -1.02822)
+# Carpeta de datos por defecto (la misma que calculan las páginas en pages/)
+IS_CLOUD = "/mount/src" in os.getcwd()
+DEFAULT_DATA_DIR = "/mount/data" if IS_CLOUD else os.path.join(os.path.dirname(__file__), "pages", "data")
+
+# Sedes para el aviso de proximidad: secrets [[sedes]] (nombre, lat, lon, radio_m).
+# Sin configuración se usa la oficina de Almansa, Albacete (radio 500 m).
+@st.cache_resource(show_spinner=False)
+def _geocerca() -> geocerca.Geocerca:
+    return geocerca.Geocerca.desde_config([dict(s) for s in st.secrets.get("sedes", [])])
 
 # =========================
 # Cookies / Sesión
@@ -32,29 +41,20 @@ def _saludo(hora: int) -> str:
     if 13 <= hora < 20: return "¡Buenas tardes"
     return "¡Buenas noches"
 
-def _leer_notificaciones(usuario: str) -> pd.DataFrame:
-    """
-    Lee notificaciones desde un CSV sencillo:
-    columnas: usuario,titulo,fecha,leido (0/1)
-    """
-    try:
-        df = pd.read_csv("notificaciones.csv")
-        if "leido" not in df.columns:
-            df["leido"] = 0
-        df["leido"] = df["leido"].fillna(0).astype(int)
-        return df[df["usuario"] == usuario].copy()
-    except FileNotFoundError:
-        return pd.DataFrame(columns=["usuario","titulo","fecha","leido"])
+@st.cache_resource(show_spinner=False)
+def _preparar_rrhh(ruta: str) -> int:
+    """Aplica las migraciones pendientes de rrhh.db una sola vez por proceso."""
+    return migraciones.migrar(ruta, migraciones.RRHH)
+
+def _db_rrhh() -> str:
+    """rrhh.db en la misma carpeta de datos que usan las páginas (DATA_DIR en secrets)."""
+    base = st.secrets.get("DATA_DIR", DEFAULT_DATA_DIR)
+    ruta = os.path.join(base, "rrhh.db")
+    _preparar_rrhh(ruta)
+    return ruta
 
 def _marcar_todas_leidas(usuario: str):
-    try:
-        df_all = pd.read_csv("notificaciones.csv")
-    except FileNotFoundError:
-        return
-    if "leido" not in df_all.columns:
-        df_all["leido"] = 0
-    df_all.loc[df_all["usuario"] == usuario, "leido"] = 1
-    df_all.to_csv("notificaciones.csv", index=False)
+    notificaciones.marcar_todas_leidas(_db_rrhh(), usuario)
 
 def render_home(usuario: str):
     # Portada sin navegación lateral automática y con FONDO en degradado
@@ -78,11 +78,9 @@ def render_home(usuario: str):
     </style>
     """, unsafe_allow_html=True)
 
-    # 1 Cargar notificaciones 
+    # 1 Cargar notificaciones (solo el contador; el listado se lee al abrirlo)
     ahora = datetime.now()
-    df_notif = _leer_notificaciones(usuario)
-    pendientes = df_notif[df_notif["leido"] == 0]
-    n_pend = int(pendientes.shape[0])
+    n_pend = notificaciones.contar_pendientes(_db_rrhh(), usuario)
 
 
     st.image(LOGO_PATH, use_column_width=True, width=420)
@@ -98,13 +96,12 @@ def render_home(usuario: str):
 
     # Lógica de geolocalización para recordatorios (al cargar la página de inicio)
     location = streamlit_geolocation()
-    if location and location['latitude'] is not 0 and location['longitude'] is not 0:
-        user_coord = (location['latitude'], location['longitude'])
-        distance_km = geopy.distance.geodesic(OFFICE_COORD, user_coord).km
-        
-        # Umbral de 100 metros
-        if distance_km <= 0.5:
-            st.info("¡Estás cerca de la oficina! Recuerda fichar tu entrada o salida.")
+    if location and location.get('latitude') and location.get('longitude'):
+        # Se recalcula solo si la posición se ha movido; la sede queda en sesión para el fichaje
+        sede = geocerca.sede_en_sesion(st.session_state, _geocerca(), location['latitude'], location['longitude'])
+        st.session_state["sede_cercana"] = sede.nombre if sede else None
+        if sede:
+            st.info(f"¡Estás cerca de la oficina ({sede.nombre})! Recuerda fichar tu entrada o salida.")
 
     # Listado de notificaciones
     if bell:
@@ -114,8 +111,8 @@ def render_home(usuario: str):
             if n_pend == 0:
                 st.info("No tienes notificaciones pendientes.")
             else:
-                for _, r in pendientes.iterrows():
-                    st.markdown(f"**• {r.get('titulo','(sin título)')}** — {r.get('fecha','')}")
+                for r in notificaciones.listar_pendientes(_db_rrhh(), usuario):
+                    st.markdown(f"**• {r['titulo'] or '(sin título)'}** — {r['fecha']}")
             c1, c2 = st.columns(2)
             with c1:
                 if st.button("Marcar todas como leídas"):
@@ -149,20 +146,76 @@ def render_home(usuario: str):
 USUARIOS_CSV = os.path.join(os.path.dirname(__file__), "usuarios.csv")
 PAGINAS_CSV = os.path.join(os.path.dirname(__file__), "rol_paginas.csv")
 
+# =========================
+# Directorio de usuarios/roles (en memoria, compartido por proceso)
+# =========================
+def _mtime(ruta):
+    try:
+        return os.path.getmtime(ruta)
+    except OSError:
+        return None
+
+def _clave_pagina(pagina: str) -> str:
+    """Clave exacta de una página: nombre del fichero, venga como 'pages/x.py', ruta absoluta o 'x.py'."""
+    return os.path.basename(str(pagina).replace("\\", "/"))
+
+def _compilar_permisos(usuarios: dict, paginas: dict) -> dict:
+    """
+    Matriz de permisos precalculada:
+      - 'acceso': {clave_pagina: set de roles}
+      - 'menus':  {rol: [(fila_pagina, habilitada), ...]} en el orden del CSV
+    """
+    acceso = {_clave_pagina(p): row["roles"] for p, row in paginas.items()}
+    roles = {u["rol"] for u in usuarios.values()}
+    for row in paginas.values():
+        roles |= row["roles"]
+    menus = {
+        rol: [(row, rol == "admin" or rol in row["roles"]) for row in paginas.values()]
+        for rol in roles
+    }
+    return {"acceso": acceso, "menus": menus}
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _cargar_directorio(mtime_usuarios, mtime_paginas) -> dict:
+    """
+    Lee usuarios.csv y rol_paginas.csv una sola vez por versión de los ficheros.
+    El mtime forma parte de la clave de caché: si el CSV cambia, se recarga.
+    """
+    dfusuarios = pd.read_csv(USUARIOS_CSV, dtype=str, keep_default_na=False)
+    usuarios = {row["usuario"]: row for row in dfusuarios.to_dict("records")}
+
+    paginas = {}
+    if mtime_paginas is not None:
+        dfPaginas = pd.read_csv(PAGINAS_CSV, dtype=str, keep_default_na=False)
+        for row in dfPaginas.to_dict("records"):
+            row["roles"] = frozenset(r.strip() for r in row["roles"].split("|") if r.strip())
+            paginas[row["pagina"]] = row
+    return {"usuarios": usuarios, "paginas": paginas, "permisos": _compilar_permisos(usuarios, paginas)}
+
+def _directorio() -> dict:
+    """Directorio vigente: {'usuarios': {usuario: fila}, 'paginas': {pagina: fila}, 'permisos': matriz}"""
+    return _cargar_directorio(_mtime(USUARIOS_CSV), _mtime(PAGINAS_CSV))
+
+def datosUsuario(usuario) -> dict:
+    """Fila de usuarios.csv del usuario (todas las columnas como texto); {} si no existe."""
+    return _directorio()["usuarios"].get(usuario, {})
+
+def listarUsuarios() -> dict:
+    """{usuario: fila de usuarios.csv} en el orden del CSV."""
+    return _directorio()["usuarios"]
+
 def validarUsuario(usuario, clave):
     """Valida usuario y clave contra usuarios.csv"""
-    dfusuarios = pd.read_csv(USUARIOS_CSV)
-    ok = len(dfusuarios[(dfusuarios['usuario'] == usuario) & (dfusuarios['clave'] == clave)]) > 0
-    return bool(ok)
+    datos = _directorio()["usuarios"].get(usuario)
+    return bool(datos) and datos["clave"] == clave
 
 def generarMenu(usuario):
     """Menú lateral simple con enlaces fijos por rol"""
     with st.sidebar:
         st.image(LOGO_PATH, use_column_width=True)
-        dfusuarios = pd.read_csv(USUARIOS_CSV)
-        dfUsuario = dfusuarios[(dfusuarios['usuario'] == usuario)]
-        nombre = dfUsuario['nombre'].values[0]
-        rol = dfUsuario['rol'].values[0]
+        datos = _directorio()["usuarios"][usuario]
+        nombre = datos['nombre']
+        rol = datos['rol']
         st.write(f"Hola **:blue-background[{nombre}]** ")
         st.caption(f"Rol: {rol}")
         #st.page_link("inicio.py", label="Inicio", icon=":material/home:")
@@ -173,6 +226,8 @@ def generarMenu(usuario):
             st.page_link("pages/paginaAusenciaMovil.py", label="Ausencia", icon=":material/group:")
         if rol in ['Modificación fecha','admin','empleado']:
             st.page_link("pages/paginaModFechaMovil.py", label="Modificaciones de fechas", icon=":material/group:")
+        if rol in ['Equipo','admin','empleado']:
+            st.page_link("pages/paginaEquipoMovil.py", label="Equipo", icon=":material/calendar_month:")
         
         btnSalir = st.button("Salir")
         if btnSalir:
@@ -182,13 +237,11 @@ def generarMenu(usuario):
 
 def validarPagina(pagina, usuario):
     """Valida si un usuario tiene permiso a 'pagina' usando rol_paginas.csv o secrets."""
-    dfusuarios = pd.read_csv(USUARIOS_CSV)
-    dfPaginas = pd.read_csv(PAGINAS_CSV)
-    dfUsuario = dfusuarios[(dfusuarios['usuario'] == usuario)]
-    rol = dfUsuario['rol'].values[0]
-    dfPagina = dfPaginas[(dfPaginas['pagina'].str.contains(pagina))]
-    if len(dfPagina) > 0:
-        if rol in dfPagina['roles'].values[0] or rol == "admin" or st.secrets.get("tipoPermiso","rol") == "rol":
+    directorio = _directorio()
+    rol = directorio["usuarios"][usuario]['rol']
+    rolesPagina = directorio["permisos"]["acceso"].get(_clave_pagina(pagina))
+    if rolesPagina is not None:
+        if rol in rolesPagina or rol == "admin" or st.secrets.get("tipoPermiso","rol") == "rol":
             return True
         else:
             return False
@@ -199,29 +252,20 @@ def generarMenuRoles(usuario):
     """Menú lateral según csv de páginas/roles, con opción de ocultar o deshabilitar."""
     with st.sidebar:
         st.image(LOGO_PATH, use_column_width=True)
-        dfusuarios = pd.read_csv(USUARIOS_CSV)
-        dfPaginas = pd.read_csv(PAGINAS_CSV)
-        dfUsuario = dfusuarios[(dfusuarios['usuario'] == usuario)]
-        nombre = dfUsuario['nombre'].values[0]
-        rol = dfUsuario['rol'].values[0]
+        directorio = _directorio()
+        datos = directorio["usuarios"][usuario]
+        nombre = datos['nombre']
+        rol = datos['rol']
         st.write(f"Hola **:blue-background[{nombre}]** ")
         st.caption(f"Rol: {rol}")
         st.subheader("Opciones")
 
         ocultar = str(st.secrets.get("ocultarOpciones", "False")) == "True"
-        if ocultar:
-            if rol != 'admin':
-                dfPaginas = dfPaginas[dfPaginas['roles'].str.contains(rol)]
-            for _, row in dfPaginas.iterrows():
-                icono = row['icono']
-                st.page_link(row['pagina'], label=row['nombre'], icon=f":material/{icono}:")
-        else:
-            for _, row in dfPaginas.iterrows():
-                deshabilitarOpcion = True
-                if (rol in row["roles"]) or rol == "admin":
-                    deshabilitarOpcion = False
-                icono = row['icono']
-                st.page_link(row['pagina'], label=row['nombre'], icon=f":material/{icono}:", disabled=deshabilitarOpcion)
+        for row, permitido in directorio["permisos"]["menus"].get(rol, []):
+            if ocultar and not permitido:
+                continue
+            icono = row['icono']
+            st.page_link(row['pagina'], label=row['nombre'], icon=f":material/{icono}:", disabled=not permitido)
 
         btnSalir = st.button("Salir")
         if btnSalir:
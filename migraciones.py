@@ -0,0 +1,162 @@
+# migraciones.py
+"""
+Migraciones versionadas de las bases SQLite.
+
+Cada base tiene una lista de pasos; el paso i (empezando en 1) lleva la base a la
+versión i. La versión aplicada se guarda en la tabla `schema_version`, así que
+cada paso se ejecuta una sola vez por base. Un paso es una lista de sentencias
+SQL o de funciones `f(conn)` para cambios que no se expresan con una sentencia.
+
+Las páginas llaman a `migrar` desde una función con `st.cache_resource`, de modo
+que tras la primera ejecución del proceso los reruns no lanzan ningún DDL.
+"""
+import adjuntos
+import db
+import horas
+
+# ======== fichajes.db ========
+FICHAJES = [
+    # 1 · tabla de fichajes
+    ["""
+        CREATE TABLE IF NOT EXISTS fichajes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            empleado TEXT NOT NULL,
+            fecha_local TEXT NOT NULL,   -- 'YYYY-MM-DD HH:MM:SS' (zona horaria local)
+            fecha_utc   TEXT NOT NULL,   -- 'YYYY-MM-DD HH:MM:SS' (UTC)
+            tipo TEXT NOT NULL CHECK (tipo IN ('Entrada','Salida')),
+            observaciones TEXT,
+            fuente TEXT DEFAULT 'movil',
+            created_at_utc TEXT DEFAULT (datetime('now'))
+        );
+    """],
+    # 2 · índices por empleado (historial por id, vistas por rango de fechas)
+    [
+        "CREATE INDEX IF NOT EXISTS idx_fichajes_empleado_fecha ON fichajes(empleado, fecha_local);",
+        "CREATE INDEX IF NOT EXISTS idx_fichajes_empleado_id    ON fichajes(empleado, id);",
+    ],
+    # 3 · resumen diario materializado (se mantiene en cada inserción) + relleno inicial
+    [
+        """
+        CREATE TABLE IF NOT EXISTS horas_diarias (
+            empleado TEXT NOT NULL,
+            fecha TEXT NOT NULL,              -- YYYY-MM-DD
+            segundos INTEGER NOT NULL,
+            marcas TEXT NOT NULL,             -- 'HH:MM - HH:MM · HH:MM - ?'
+            incompleto INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (empleado, fecha)
+        ) WITHOUT ROWID;
+        """,
+        horas.reconstruir,
+    ],
+    # 4 · sede (geocerca) en la que se encontraba el usuario al fichar
+    ["ALTER TABLE fichajes ADD COLUMN sede TEXT;"],
+    # 5 · clave de idempotencia de los fichajes enviados en lote (reenvíos no duplican)
+    [
+        "ALTER TABLE fichajes ADD COLUMN clave TEXT;",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_fichajes_clave ON fichajes(clave) WHERE clave IS NOT NULL;",
+    ],
+]
+
+# ======== rrhh.db ========
+RRHH = [
+    # 1 · vacaciones y bajas/permisos
+    [
+        """
+        CREATE TABLE IF NOT EXISTS vacaciones(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            usuario TEXT NOT NULL,
+            fecha_inicio TEXT NOT NULL,   -- YYYY-MM-DD
+            fecha_fin    TEXT NOT NULL,   -- YYYY-MM-DD
+            dias INTEGER NOT NULL,
+            comentario TEXT,
+            estado TEXT NOT NULL DEFAULT 'Pendiente',  -- Pendiente | Aprobado | Rechazado | Cancelado
+            fecha_solicitud TEXT NOT NULL              -- YYYY-MM-DD HH:MM:SS
+        );
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_vacaciones_usuario ON vacaciones(usuario);",
+        "CREATE INDEX IF NOT EXISTS idx_vacaciones_estado  ON vacaciones(estado);",
+        """
+        CREATE TABLE IF NOT EXISTS bajas(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            usuario TEXT NOT NULL,
+            tipo TEXT NOT NULL,              -- Enfermedad común | Accidente laboral | Paternidad/Maternidad | Otros
+            fecha_inicio TEXT NOT NULL,      -- YYYY-MM-DD
+            fecha_fin TEXT,                  -- opcional
+            descripcion TEXT,
+            archivos TEXT,                   -- rutas separadas por ';'
+            estado TEXT NOT NULL DEFAULT 'Notificada',
+            fecha_registro TEXT NOT NULL     -- YYYY-MM-DD HH:MM:SS
+        );
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_bajas_usuario ON bajas(usuario);",
+    ],
+    # 2 · notificaciones (antes notificaciones.csv)
+    [
+        """
+        CREATE TABLE IF NOT EXISTS notificaciones(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            usuario TEXT NOT NULL,
+            titulo TEXT NOT NULL,
+            fecha TEXT NOT NULL,             -- YYYY-MM-DD HH:MM:SS
+            leido INTEGER NOT NULL DEFAULT 0
+        );
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_notificaciones_usuario_leido ON notificaciones(usuario, leido);",
+    ],
+    # 3 · adjuntos de bajas en tabla propia (antes rutas separadas por ';' en bajas.archivos)
+    [
+        """
+        CREATE TABLE IF NOT EXISTS bajas_adjuntos(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            baja_id INTEGER NOT NULL REFERENCES bajas(id),
+            usuario TEXT NOT NULL,
+            nombre TEXT NOT NULL,            -- nombre original del archivo subido
+            sha256 TEXT,                     -- contenido (NULL si el archivo ya no existía al migrar)
+            tamano INTEGER,                  -- bytes
+            ruta TEXT NOT NULL,
+            fecha_subida TEXT NOT NULL       -- YYYY-MM-DD HH:MM:SS
+        );
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_bajas_adjuntos_baja ON bajas_adjuntos(baja_id);",
+        "CREATE INDEX IF NOT EXISTS idx_bajas_adjuntos_usuario_sha ON bajas_adjuntos(usuario, sha256);",
+        adjuntos.migrar_archivos,
+    ],
+    # 4 · miniatura de los adjuntos de imagen (la genera imagenes.py en segundo plano)
+    ["ALTER TABLE bajas_adjuntos ADD COLUMN miniatura TEXT;"],
+    # 5 · rangos por usuario para el calendario de equipo (equipo.py)
+    [
+        "CREATE INDEX IF NOT EXISTS idx_vacaciones_usuario_fechas ON vacaciones(usuario, fecha_inicio, fecha_fin);",
+        "CREATE INDEX IF NOT EXISTS idx_bajas_usuario_fechas ON bajas(usuario, fecha_inicio, fecha_fin);",
+    ],
+]
+
+
+def version_actual(conn) -> int:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            aplicada_utc TEXT NOT NULL DEFAULT (datetime('now'))
+        );
+    """)
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+
+def migrar(ruta: str, pasos: list) -> int:
+    """
+    Aplica en orden los pasos pendientes sobre la base `ruta` y devuelve la versión final.
+    Todo ocurre en una transacción BEGIN IMMEDIATE: si otro proceso está migrando la
+    misma base, este espera y después solo aplica lo que quede pendiente.
+    """
+    with db.conexion(ruta) as conn:
+        conn.execute("BEGIN IMMEDIATE;")
+        actual = version_actual(conn)
+        for version, paso in enumerate(pasos, start=1):
+            if version <= actual:
+                continue
+            for sentencia in paso:
+                if callable(sentencia):
+                    sentencia(conn)
+                else:
+                    conn.execute(sentencia)
+            conn.execute("INSERT INTO schema_version(version) VALUES (?);", (version,))
+        return max(actual, len(pasos))
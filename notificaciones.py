@@ -0,0 +1,100 @@
+# notificaciones.py
+"""
+Notificaciones de usuario guardadas en rrhh.db (tabla `notificaciones`).
+
+El índice (usuario, leido) hace que el contador del badge y el listado de
+pendientes sean búsquedas indexadas, y marcar como leídas es un único UPDATE.
+Contador y listado se cachean por usuario durante TTL_S segundos; marcar como
+leídas o crear una notificación invalida la caché de ese usuario.
+
+Importación única del antiguo notificaciones.csv (usuario,titulo,fecha,leido):
+
+    python notificaciones.py ruta/a/rrhh.db ruta/a/notificaciones.csv
+"""
+import csv
+import os
+from datetime import datetime
+
+import cache
+import db
+
+TABLA = "notificaciones"
+TTL_S = 30
+
+_cache = cache.CachePorUsuario(ttl_s=TTL_S)
+
+
+def _contar(ruta: str, usuario: str) -> int:
+    with db.conexion(ruta) as conn:
+        return conn.execute(
+            f"SELECT COUNT(*) FROM {TABLA} WHERE usuario = ? AND leido = 0;", (usuario,)
+        ).fetchone()[0]
+
+
+def _listar(ruta: str, usuario: str) -> list[dict]:
+    with db.conexion(ruta) as conn:
+        filas = conn.execute(
+            f"SELECT id, titulo, fecha FROM {TABLA} WHERE usuario = ? AND leido = 0 ORDER BY id DESC;",
+            (usuario,)
+        ).fetchall()
+    return [{"id": i, "titulo": t, "fecha": f} for i, t, f in filas]
+
+
+def contar_pendientes(ruta: str, usuario: str) -> int:
+    return _cache.obtener(usuario, (ruta, "contar"), lambda: _contar(ruta, usuario))
+
+
+def listar_pendientes(ruta: str, usuario: str) -> list[dict]:
+    """Notificaciones sin leer del usuario, más recientes primero."""
+    return _cache.obtener(usuario, (ruta, "listar"), lambda: _listar(ruta, usuario))
+
+
+def marcar_todas_leidas(ruta: str, usuario: str) -> int:
+    with db.conexion(ruta) as conn:
+        n = conn.execute(
+            f"UPDATE {TABLA} SET leido = 1 WHERE usuario = ? AND leido = 0;", (usuario,)
+        ).rowcount
+    _cache.invalidar(usuario)
+    return n
+
+
+def crear(ruta: str, usuario: str, titulo: str, fecha: str | None = None):
+    fecha = fecha or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    with db.conexion(ruta) as conn:
+        conn.execute(
+            f"INSERT INTO {TABLA} (usuario, titulo, fecha, leido) VALUES (?, ?, ?, 0);",
+            (usuario, titulo, fecha)
+        )
+    _cache.invalidar(usuario)
+
+
+def importar_csv(ruta: str, ruta_csv: str) -> int:
+    """Copia las filas del CSV a la tabla en una transacción. Devuelve las filas importadas."""
+    with open(ruta_csv, newline="", encoding="utf-8") as f:
+        filas = [
+            (r["usuario"], r.get("titulo") or "(sin título)", r.get("fecha") or "",
+             1 if str(r.get("leido") or "0").strip() in ("1", "1.0", "True", "true") else 0)
+            for r in csv.DictReader(f) if r.get("usuario")
+        ]
+    with db.conexion(ruta) as conn:
+        conn.executemany(f"INSERT INTO {TABLA} (usuario, titulo, fecha, leido) VALUES (?, ?, ?, ?);", filas)
+    for usuario in {f[0] for f in filas}:
+        _cache.invalidar(usuario)
+    return len(filas)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import migraciones
+
+    ap = argparse.ArgumentParser(description="Importa notificaciones.csv a la tabla notificaciones de rrhh.db.")
+    ap.add_argument("ruta", help="ruta de rrhh.db")
+    ap.add_argument("csv", help="ruta de notificaciones.csv")
+    args = ap.parse_args()
+
+    migraciones.migrar(args.ruta, migraciones.RRHH)
+    n = importar_csv(args.ruta, args.csv)
+    # Se renombra para que la importación no se repita por error
+    os.replace(args.csv, args.csv + ".importado")
+    print(f"{n} notificaciones importadas; CSV renombrado a {args.csv}.importado")
@@ -1,8 +1,14 @@
 import streamlit as st
 import pandas as pd
 import login as login
+import db
+import migraciones
+import cache
+import adjuntos
+import imagenes
+import vacaciones
+import equipo
 import os
-import sqlite3
 from datetime import datetime, date, timedelta
 import config as cfg
 
@@ -26,88 +32,164 @@ DB_FILE = DB_RRHH
 VAC_TABLE = "vacaciones"
 BAJ_TABLE = "bajas"
 
+# Límites de adjuntos (opcionales en secrets)
+ADJUNTO_MAX_MB    = float(st.secrets.get("adjuntoMaxMB", adjuntos.MAX_MB))
+ADJUNTOS_CUOTA_MB = float(st.secrets.get("adjuntosCuotaMB", adjuntos.CUOTA_MB))
+IMAGEN_MAX_PX     = int(st.secrets.get("imagenMaxPx", imagenes.MAX_PX))
+IMAGEN_CALIDAD    = int(st.secrets.get("imagenCalidad", imagenes.CALIDAD))
 
-def get_conn():
-    os.makedirs(os.path.dirname(DB_FILE), exist_ok=True)
-    return sqlite3.connect(DB_FILE)
-
-def ensure_tables():
-    with get_conn() as conn:
-        cur = conn.cursor()
-        # Vacaciones
-        cur.execute(f"""
-            CREATE TABLE IF NOT EXISTS {VAC_TABLE}(
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                usuario TEXT NOT NULL,
-                fecha_inicio TEXT NOT NULL,   -- YYYY-MM-DD
-                fecha_fin    TEXT NOT NULL,   -- YYYY-MM-DD
-                dias INTEGER NOT NULL,
-                comentario TEXT,
-                estado TEXT NOT NULL DEFAULT 'Pendiente',  -- Pendiente | Aprobado | Rechazado | Cancelado
-                fecha_solicitud TEXT NOT NULL              -- YYYY-MM-DD HH:MM:SS
-            );
-        """)
-        cur.execute(f"CREATE INDEX IF NOT EXISTS idx_{VAC_TABLE}_usuario ON {VAC_TABLE}(usuario);")
-        cur.execute(f"CREATE INDEX IF NOT EXISTS idx_{VAC_TABLE}_estado  ON {VAC_TABLE}(estado);")
-
-        # Bajas / permisos
-        cur.execute(f"""
-            CREATE TABLE IF NOT EXISTS {BAJ_TABLE}(
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                usuario TEXT NOT NULL,
-                tipo TEXT NOT NULL,              -- Enfermedad común | Accidente laboral | Paternidad/Maternidad | Otros
-                fecha_inicio TEXT NOT NULL,      -- YYYY-MM-DD
-                fecha_fin TEXT,                  -- opcional
-                descripcion TEXT,
-                archivos TEXT,                   -- rutas separadas por ';'
-                estado TEXT NOT NULL DEFAULT 'Notificada',
-                fecha_registro TEXT NOT NULL     -- YYYY-MM-DD HH:MM:SS
-            );
-        """)
-        cur.execute(f"CREATE INDEX IF NOT EXISTS idx_{BAJ_TABLE}_usuario ON {BAJ_TABLE}(usuario);")
-        conn.commit()
-
-def guardar_vacaciones(usuario:str, fi:date, ff:date, dias:int, comentario:str):
-    with get_conn() as conn:
-        conn.execute(f"""
+# Listas de vacaciones y bajas cacheadas por usuario; cada escritura invalida solo a su usuario
+_lecturas = cache.compartida("rrhh")
+PAGINA_LISTAS = int(st.secrets.get("paginaListas", 20))   # filas del histórico por página
+PAGINA_TARJETAS = int(st.secrets.get("paginaTarjetas", 5))  # bajas abiertas (tarjetas) por página
+
+def _invalidar(usuario:str):
+    """Tras cambiar ausencias de `usuario`: sus listas y el calendario del equipo de su superior."""
+    _lecturas.invalidar(usuario)
+    equipo.invalidar(login.datosUsuario(usuario).get("superior"))
+
+@st.cache_resource(show_spinner=False)
+def ensure_tables(ruta: str) -> int:
+    """Aplica las migraciones pendientes de rrhh.db una sola vez por proceso."""
+    return migraciones.migrar(ruta, migraciones.RRHH)
+
+def motor_vacaciones(recargar:bool=False) -> vacaciones.MotorVacaciones:
+    return vacaciones.motor(DB_FILE, st.secrets.get("festivos", []), recargar)
+
+def cupo_vacaciones(usuario:str) -> int:
+    return vacaciones.cupo(login.datosUsuario(usuario).get("dias_vacaciones"))
+
+def guardar_vacaciones(usuario:str, fi:date, ff:date, comentario:str):
+    """
+    Comprueba solapes y saldo (vacaciones.SolicitudInvalida) y guarda los días laborables.
+    El motor en memoria es solo un filtro rápido (puede ir por detrás de otro proceso);
+    la comprobación que vale se repite en SQL en la misma transacción que el INSERT.
+    """
+    cupo = cupo_vacaciones(usuario)
+    motor = motor_vacaciones()
+    try:
+        motor.comprobar(usuario, fi, ff, cupo)
+    except vacaciones.SolicitudInvalida:
+        motor = motor_vacaciones(recargar=True)    # si estaba desfasado, decide la base
+    with db.conexion(DB_FILE) as conn:
+        conn.execute("BEGIN IMMEDIATE;")
+        dias = vacaciones.comprobar_en_base(conn, motor.calendario, usuario, fi, ff, cupo)
+        cur = conn.execute(f"""
             INSERT INTO {VAC_TABLE}(usuario, fecha_inicio, fecha_fin, dias, comentario, estado, fecha_solicitud)
             VALUES (?, ?, ?, ?, ?, 'Pendiente', ?)
         """, (usuario, fi.strftime("%Y-%m-%d"), ff.strftime("%Y-%m-%d"), dias, comentario or "", datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
-        conn.commit()
-
-def listar_vacaciones(usuario:str)->pd.DataFrame:
-    with get_conn() as conn:
-        return pd.read_sql_query(
-            f"SELECT id, fecha_inicio, fecha_fin, dias, comentario, estado, fecha_solicitud "
-            f"FROM {VAC_TABLE} WHERE usuario=? ORDER BY id DESC",
-            conn, params=(usuario,)
-        )
+    motor.agregar(cur.lastrowid, usuario, fi, ff)
+    _invalidar(usuario)
+
+def listar_vacaciones(usuario:str, pendientes:bool, antes_de_id:int|None=None, limit:int|None=None)->pd.DataFrame:
+    """
+    Solicitudes del usuario, más recientes primero: las Pendiente (las únicas con acción)
+    o el resto. `antes_de_id` es el cursor (id de la última fila de la página anterior) y
+    con `limit` se devuelven hasta limit+1 filas: la sobrante solo indica que hay más.
+    """
+    clave = ("vacaciones", DB_FILE, pendientes, antes_de_id, limit)
+    return _lecturas.obtener(usuario, clave, lambda: _leer_vacaciones(usuario, pendientes, antes_de_id, limit)).copy()
+
+def _leer_vacaciones(usuario:str, pendientes:bool, antes_de_id:int|None, limit:int|None)->pd.DataFrame:
+    condiciones = ["usuario=?", "estado='Pendiente'" if pendientes else "estado<>'Pendiente'"]
+    params = [usuario]
+    if antes_de_id is not None:
+        condiciones.append("id<?")
+        params.append(int(antes_de_id))
+    sql = (f"SELECT id, fecha_inicio, fecha_fin, dias, comentario, estado, fecha_solicitud "
+           f"FROM {VAC_TABLE} WHERE {' AND '.join(condiciones)} ORDER BY id DESC")
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit + 1)
+    with db.conexion(DB_FILE) as conn:
+        return pd.read_sql_query(sql, conn, params=params)
 
 def cancelar_vacacion(id_:int, usuario:str):
-    with get_conn() as conn:
-        conn.execute(f"UPDATE {VAC_TABLE} SET estado='Cancelado' WHERE id=? AND usuario=?", (id_, usuario))
-        conn.commit()
-
-def guardar_baja(usuario:str, tipo:str, fi:date, ff:date|None, descripcion:str, archivos_paths:list[str]):
-    rutas = ";".join(archivos_paths) if archivos_paths else ""
-    with get_conn() as conn:
-        conn.execute(f"""
+    with db.conexion(DB_FILE) as conn:
+        n = conn.execute(f"UPDATE {VAC_TABLE} SET estado='Cancelado' WHERE id=? AND usuario=?", (id_, usuario)).rowcount
+    if n:
+        motor_vacaciones().quitar(id_)
+    _invalidar(usuario)
+
+def guardar_baja(usuario:str, tipo:str, fi:date, ff:date|None, descripcion:str, archivos:list):
+    """
+    Registra la baja y sus adjuntos (subidas de st.file_uploader) en una transacción.
+    Las fotos se reducen después, en segundo plano (imagenes.encolar).
+    """
+    with db.conexion(DB_FILE) as conn:
+        cur = conn.execute(f"""
             INSERT INTO {BAJ_TABLE}(usuario, tipo, fecha_inicio, fecha_fin, descripcion, archivos, estado, fecha_registro)
-            VALUES (?, ?, ?, ?, ?, ?, 'Notificada', ?)
+            VALUES (?, ?, ?, ?, ?, '', 'Notificada', ?)
         """, (usuario, tipo, fi.strftime("%Y-%m-%d"), ff.strftime("%Y-%m-%d") if ff else None,
-              descripcion or "", rutas, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
-        conn.commit()
-
-def listar_bajas(usuario:str)->pd.DataFrame:
-    with get_conn() as conn:
-        return pd.read_sql_query(
-            f"SELECT id, tipo, fecha_inicio, IFNULL(fecha_fin,'') AS fecha_fin, descripcion, estado, archivos, fecha_registro "
-            f"FROM {BAJ_TABLE} WHERE usuario=? ORDER BY id DESC",
-            conn, params=(usuario,)
-        )
+              descripcion or "", datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+        adjuntos.guardar(conn, BAJAS_DIR, cur.lastrowid, usuario, [(f.name, f) for f in archivos or []],
+                         max_bytes=int(ADJUNTO_MAX_MB * 2**20), cuota_bytes=int(ADJUNTOS_CUOTA_MB * 2**20))
+    _invalidar(usuario)
+    if any(imagenes.es_imagen(f.name) for f in archivos or []):
+        imagenes.encolar(DB_FILE, BAJAS_DIR, cur.lastrowid, IMAGEN_MAX_PX, IMAGEN_CALIDAD)
+
+def listar_bajas(usuario:str, abiertas:bool, antes_de_id:int|None=None, limit:int|None=None)->pd.DataFrame:
+    """
+    Bajas del usuario, más recientes primero: las abiertas (acaban hoy o después) o las ya
+    terminadas, paginadas como listar_vacaciones. Sin fecha fin cuentan como de un día,
+    igual que en el calendario de equipo (equipo.py). Solo se cargan los adjuntos de las
+    filas devueltas.
+    """
+    hoy = date.today().strftime("%Y-%m-%d")
+    clave = ("bajas", DB_FILE, abiertas, hoy, antes_de_id, limit)
+    return _lecturas.obtener(usuario, clave, lambda: _leer_bajas(usuario, abiertas, hoy, antes_de_id, limit)).copy()
+
+def _leer_bajas(usuario:str, abiertas:bool, hoy:str, antes_de_id:int|None, limit:int|None)->pd.DataFrame:
+    condiciones = ["usuario=?", "IFNULL(fecha_fin, fecha_inicio)" + (">=?" if abiertas else "<?")]
+    params = [usuario, hoy]
+    if antes_de_id is not None:
+        condiciones.append("id<?")
+        params.append(int(antes_de_id))
+    sql = (f"SELECT id, tipo, fecha_inicio, IFNULL(fecha_fin,'') AS fecha_fin, descripcion, estado, fecha_registro "
+           f"FROM {BAJ_TABLE} WHERE {' AND '.join(condiciones)} ORDER BY id DESC")
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit + 1)
+    with db.conexion(DB_FILE) as conn:
+        df = pd.read_sql_query(sql, conn, params=params)
+        por_baja = adjuntos.listar(conn, usuario, df["id"].tolist())
+    df["adjuntos"] = [por_baja.get(i, []) for i in df["id"]]
+    return df
+
+def _paginador(clave:str, df:pd.DataFrame, hay_anteriores:bool):
+    """Botones de la página de histórico; la pila de cursores vive en st.session_state[clave]."""
+    cursores = st.session_state[clave]
+    p1, p2 = st.columns(2)
+    with p1:
+        if len(cursores) > 1 and st.button("Más recientes", key=f"{clave}_recientes", use_container_width=True):
+            cursores.pop()
+            st.rerun()
+    with p2:
+        if hay_anteriores and st.button("Cargar anteriores", key=f"{clave}_anteriores", use_container_width=True):
+            cursores.append(int(df["id"].iloc[-1]))
+            st.rerun()
+
+def _adjuntos_baja(row):
+    # Solo metadatos de bajas_adjuntos; los bytes se leen al pedir la descarga de ese adjunto
+    for i, adj in enumerate(row['adjuntos']):
+        st.caption(f"• {adj.nombre} ({adjuntos.formato_tamano(adj.tamano)})")
+        if adj.miniatura:
+            st.image(adj.miniatura, width=imagenes.MINIATURA_PX)
+        if adj.tamano is None:
+            continue
+        if st.session_state.get("adjunto_listo") != (row['id'], i):
+            if st.button(f"Preparar descarga {i+1}", key=f"prep_{row['id']}_{i}"):
+                st.session_state["adjunto_listo"] = (row['id'], i)
+                st.rerun()
+        else:
+            try:
+                with adjuntos.abrir(adj.ruta) as f:
+                    st.download_button(f"Descargar adjunto {i+1}", f, file_name=adj.nombre, key=f"dl_{row['id']}_{i}")
+            except OSError:
+                st.caption(f"• {adj.nombre} (no encontrado)")
 
 # ================= UI ==================
-ensure_tables()
+ensure_tables(DB_FILE)
 
 st.header("Ausencias")
 
@@ -131,8 +213,11 @@ with tab1:
     if ff < fi:
         st.error("La fecha de fin no puede ser anterior a la fecha de inicio.")
     else:
-        dias = (ff - fi).days + 1
-        st.info(f"Días solicitados: **{dias}**")
+        motor = motor_vacaciones()
+        dias = motor.calendario.laborables(fi, ff)
+        cupo = cupo_vacaciones(usuario_actual)
+        st.info(f"Días laborables solicitados: **{dias}** · te quedan "
+                f"**{motor.restantes(usuario_actual, fi.year, cupo)}** de {cupo} en {fi.year}")
 
     comentario = st.text_area("Comentario (opcional)")
 
@@ -140,29 +225,43 @@ with tab1:
     with cols_btn[0]:
         if st.button("Enviar solicitud", type="primary", use_container_width=True, disabled=ff < fi):
             try:
-                guardar_vacaciones(usuario_actual, fi, ff, dias, comentario)
+                guardar_vacaciones(usuario_actual, fi, ff, comentario)
                 st.success("Solicitud enviada. Estado: Pendiente")
                 st.rerun()
+            except vacaciones.SolicitudInvalida as e:
+                st.error(str(e))
             except Exception as e:
                 st.error(f"Error al guardar la solicitud: {e}")
 
     st.markdown("---")
     st.caption("Tus solicitudes")
-    dfv = listar_vacaciones(usuario_actual)
-    if dfv.empty:
+    # Las pendientes (con botón de cancelar) como tarjetas; el resto en una tabla paginada
+    dfp = listar_vacaciones(usuario_actual, pendientes=True)
+    for _, row in dfp.iterrows():
+        with st.container(border=True):
+            st.write(f"📅 {row['fecha_inicio']} → {row['fecha_fin']}  ·  {row['dias']} día(s)  ·  **{row['estado']}**")
+            if str(row['comentario']).strip():
+                st.caption(row['comentario'])
+            if st.button("Cancelar", key=f"cancel_{row['id']}"):
+                cancelar_vacacion(int(row['id']), usuario_actual)
+                st.success("Solicitud cancelada.")
+                st.rerun()
+
+    cursores_v = st.session_state.setdefault("vacaciones_cursores", [None])
+    dfv = listar_vacaciones(usuario_actual, pendientes=False, antes_de_id=cursores_v[-1], limit=PAGINA_LISTAS)
+    hay_anteriores = len(dfv) > PAGINA_LISTAS
+    dfv = dfv.iloc[:PAGINA_LISTAS]
+    if dfp.empty and dfv.empty and len(cursores_v) == 1:
         st.info("Aún no has realizado solicitudes de vacaciones.")
-    else:
-        # Botón de cancelar para las pendientes
-        for _, row in dfv.iterrows():
-            with st.container(border=True):
-                st.write(f"📅 {row['fecha_inicio']} → {row['fecha_fin']}  ·  {row['dias']} día(s)  ·  **{row['estado']}**")
-                if str(row['comentario']).strip():
-                    st.caption(row['comentario'])
-                if row['estado'] == 'Pendiente':
-                    if st.button("Cancelar", key=f"cancel_{row['id']}"):
-                        cancelar_vacacion(int(row['id']), usuario_actual)
-                        st.success("Solicitud cancelada.")
-                        st.rerun()
+    elif not dfv.empty or len(cursores_v) > 1:
+        st.dataframe(
+            dfv.drop(columns="id").rename(columns={
+                "fecha_inicio": "Inicio", "fecha_fin": "Fin", "dias": "Días", "comentario": "Comentario",
+                "estado": "Estado", "fecha_solicitud": "Solicitada"
+            }),
+            use_container_width=True, hide_index=True
+        )
+        _paginador("vacaciones_cursores", dfv, hay_anteriores)
 
 # ---- Tab Bajas / Permisos ----
 with tab2:
@@ -183,42 +282,53 @@ with tab2:
     # Guardar
     if st.button("Notificar baja / permiso", type="primary"):
         try:
-            # Guardar adjuntos
-            carpeta = os.path.join(cfg.BAJAS_DIR, usuario_actual)
-            os.makedirs(carpeta, exist_ok=True)
-            saved = []
-            if files:
-                for f in files:
-                    safe_name = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{f.name}"
-                    path = os.path.join(carpeta, safe_name)
-                    with open(path, "wb") as out:
-                        out.write(f.getbuffer())
-                    saved.append(path)
-            guardar_baja(usuario_actual, tipo, fi_b, (ff_b if usar_fin else None), descripcion, saved)
+            guardar_baja(usuario_actual, tipo, fi_b, (ff_b if usar_fin else None), descripcion, files)
             st.success("Baja / permiso registrado correctamente.")
             st.rerun()
+        except adjuntos.LimiteExcedido as e:
+            st.error(str(e))
         except Exception as e:
             st.error(f"Error al registrar la baja: {e}")
 
     st.markdown("---")
     st.caption("Tus bajas / permisos comunicados")
-    dfb = listar_bajas(usuario_actual)
-    if dfb.empty:
+    # Las abiertas como tarjetas con sus adjuntos; las terminadas en una tabla paginada
+    cursores_a = st.session_state.setdefault("bajas_abiertas_cursores", [None])
+    dfa = listar_bajas(usuario_actual, abiertas=True, antes_de_id=cursores_a[-1], limit=PAGINA_TARJETAS)
+    hay_mas_abiertas = len(dfa) > PAGINA_TARJETAS
+    dfa = dfa.iloc[:PAGINA_TARJETAS]
+    for _, row in dfa.iterrows():
+        with st.container(border=True):
+            rango = f"{row['fecha_inicio']}" + (f" → {row['fecha_fin']}" if str(row['fecha_fin']).strip() else "")
+            st.write(f"🧾 **{row['tipo']}** · {rango} · **{row['estado']}**")
+            if str(row['descripcion']).strip():
+                st.caption(row['descripcion'])
+            if row['adjuntos']:
+                st.caption("Adjuntos:")
+                _adjuntos_baja(row)
+    _paginador("bajas_abiertas_cursores", dfa, hay_mas_abiertas)
+
+    cursores_b = st.session_state.setdefault("bajas_cursores", [None])
+    dfb = listar_bajas(usuario_actual, abiertas=False, antes_de_id=cursores_b[-1], limit=PAGINA_LISTAS)
+    hay_anteriores = len(dfb) > PAGINA_LISTAS
+    dfb = dfb.iloc[:PAGINA_LISTAS]
+    if dfa.empty and dfb.empty and len(cursores_a) == 1 and len(cursores_b) == 1:
         st.info("No hay bajas ni permisos registrados.")
-    else:
-        # Mostrar con posibilidad de descargar adjuntos
-        for _, row in dfb.iterrows():
-            with st.container(border=True):
-                rango = f"{row['fecha_inicio']}" + (f" → {row['fecha_fin']}" if str(row['fecha_fin']).strip() else "")
-                st.write(f"🧾 **{row['tipo']}** · {rango} · **{row['estado']}**")
-                if str(row['descripcion']).strip():
-                    st.caption(row['descripcion'])
-                if str(row['archivos']).strip():
-                    st.caption("Adjuntos:")
-                    rutas = str(row['archivos']).split(';')
-                    for i, ruta in enumerate([r for r in rutas if r]):
-                        try:
-                            with open(ruta, "rb") as f:
-                                st.download_button(f"Descargar adjunto {i+1}", f.read(), file_name=os.path.basename(ruta), key=f"dl_{row['id']}_{i}")
-                        except Exception:
-                            st.caption(f"• {os.path.basename(ruta)} (no encontrado)")
\ No newline at end of file
+    elif not dfb.empty or len(cursores_b) > 1:
+        st.dataframe(
+            dfb.assign(adjuntos=dfb["adjuntos"].map(len)).drop(columns="id").rename(columns={
+                "tipo": "Tipo", "fecha_inicio": "Inicio", "fecha_fin": "Fin", "descripcion": "Descripción",
+                "estado": "Estado", "fecha_registro": "Registrada", "adjuntos": "Adjuntos"
+            }),
+            use_container_width=True, hide_index=True
+        )
+        # Los adjuntos de las terminadas, solo de la que se elija
+        con_adjuntos = {int(r['id']): r for _, r in dfb.iterrows() if r['adjuntos']}
+        if con_adjuntos:
+            elegida = st.selectbox(
+                "Ver adjuntos de", list(con_adjuntos), index=None, placeholder="Elige una baja",
+                format_func=lambda i: f"{con_adjuntos[i]['tipo']} · {con_adjuntos[i]['fecha_inicio']}"
+            )
+            if elegida is not None:
+                _adjuntos_baja(con_adjuntos[elegida])
+        _paginador("bajas_cursores", dfb, hay_anteriores)
\ No newline at end of file
@@ -0,0 +1,70 @@
+import streamlit as st
+import pandas as pd
+import login as login
+import migraciones
+import equipo
+import os
+from datetime import date
+
+IS_CLOUD = "/mount/src" in os.getcwd()
+DEFAULT_DATA_DIR = "/mount/data" if IS_CLOUD else os.path.join(os.path.dirname(__file__), "data")
+
+BASE_DIR = st.secrets.get("DATA_DIR", DEFAULT_DATA_DIR)
+os.makedirs(BASE_DIR, exist_ok=True)
+
+DB_RRHH = os.path.join(BASE_DIR, "rrhh.db")
+
+archivo = __file__.split("\\")[-1]   # nombre del archivo actual
+login.generarLogin(archivo)
+
+
+# ======== Config DB (SQLite) ========
+DB_FILE = DB_RRHH
+
+MESES_ES = ["Enero","Febrero","Marzo","Abril","Mayo","Junio","Julio","Agosto","Septiembre","Octubre","Noviembre","Diciembre"]
+DIAS_ES = ["Lun","Mar","Mié","Jue","Vie","Sáb","Dom"]
+
+@st.cache_resource(show_spinner=False)
+def ensure_tables(ruta: str) -> int:
+    """Aplica las migraciones pendientes de rrhh.db una sola vez por proceso."""
+    return migraciones.migrar(ruta, migraciones.RRHH)
+
+# ================= UI ==================
+ensure_tables(DB_FILE)
+
+st.header("Calendario del equipo")
+
+if 'usuario' not in st.session_state:
+    st.warning("Acceso denegado. Inicia sesión.")
+    st.stop()
+
+usuario_actual = st.session_state['usuario']
+usuarios = login.listarUsuarios()
+miembros = equipo.subordinados(usuarios, usuario_actual)
+if not miembros:
+    st.info("No tienes personas a tu cargo.")
+    st.stop()
+
+# Selector de mes
+hoy = date.today()
+c1, c2 = st.columns(2)
+with c1:
+    mes = st.selectbox("Mes", range(1, 13), index=hoy.month - 1, format_func=lambda m: MESES_ES[m - 1])
+with c2:
+    anio = st.number_input("Año", min_value=2000, max_value=2100, value=hoy.year, step=1)
+
+dias, matriz = equipo.ocupacion_mes(DB_FILE, usuario_actual, miembros, int(anio), int(mes))
+
+if date(int(anio), int(mes), 1) <= hoy <= dias[-1]:
+    fuera = [usuarios[m]["nombre"] for m, c in zip(miembros, matriz[hoy.day - 1]) if c != equipo.LIBRE]
+    st.caption(f"Hoy fuera: **{', '.join(fuera)}**" if fuera else "Hoy no falta nadie del equipo.")
+
+# Tabla día × empleado (leyenda: 🟡 vacaciones pendientes · 🟢 vacaciones aprobadas · 🔴 baja/permiso)
+etiquetas = pd.Series(equipo.ETIQUETAS)
+df_cal = pd.DataFrame(
+    {usuarios[m]["nombre"] or m: etiquetas.reindex(matriz[:, j]).to_numpy() for j, m in enumerate(miembros)},
+    index=[f"{DIAS_ES[d.weekday()]} {d.day:02d}" for d in dias],
+)
+df_cal["Fuera"] = (matriz != equipo.LIBRE).sum(axis=1)
+st.dataframe(df_cal, use_container_width=True, height=(len(dias) + 1) * 35 + 3)
+st.caption("🟡 vacaciones pendientes · 🟢 vacaciones aprobadas · 🔴 baja / permiso")
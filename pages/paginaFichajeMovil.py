@@ -1,6 +1,6 @@
 import streamlit as st
 import pandas as pd
-from datetime import datetime
+from datetime import date
 import os, sys
 
 ROOT_DIR = os.path.dirname(os.path.dirname(__file__))  # sube de /pages a la raíz
@@ -9,17 +9,13 @@ if ROOT_DIR not in sys.path:
 
 
 import login as login
+import db
+import migraciones
+import fichajes
+import archivado
 
-import sqlite3
-from datetime import datetime, timezone
 import config as cfg
-from streamlit_webrtc import webrtc_streamer, VideoTransformerBase
-import cv2
-import av
-import numpy as np
-import qrcode
-import time
-import re
+# OpenCV, av y streamlit_webrtc se importan solo cuando se usa el lector de QR (ver _qr_scanner)
 
 
 
@@ -45,82 +41,149 @@ login.generarLogin(archivo)
 DB_FILE = DB_FICHAJES
 TABLE = "fichajes"
 
-def get_conn():
-    os.makedirs(os.path.dirname(DB_FILE), exist_ok=True)
-    return sqlite3.connect(DB_FILE)
-
-def ensure_schema():
-    with get_conn() as conn:
-        cur = conn.cursor()
-        cur.execute(f"""
-            CREATE TABLE IF NOT EXISTS {TABLE} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                empleado TEXT NOT NULL,
-                fecha_local TEXT NOT NULL,   -- 'YYYY-MM-DD HH:MM:SS'
-                fecha_utc   TEXT NOT NULL,   -- 'YYYY-MM-DD HH:MM:SS' (UTC)
-                tipo TEXT NOT NULL CHECK (tipo IN ('Entrada','Salida')),
-                observaciones TEXT,
-                fuente TEXT DEFAULT 'movil',
-                created_at_utc TEXT DEFAULT (datetime('now'))
-            );
-        """)
-        conn.commit()
-
-def insertar_fichaje(empleado: str, tipo: str, observaciones: str) -> dict:
-    """Inserta el fichaje usando el instante real de pulsación."""
-    now_local = datetime.now()
-    now_utc = datetime.now(timezone.utc)
-    registro = {
-        "empleado": empleado,
-        "fecha_local": now_local.strftime("%Y-%m-%d %H:%M:%S"),
-        "fecha_utc":   now_utc.strftime("%Y-%m-%d %H:%M:%S"),
-        "tipo": tipo,
-        "observaciones": observaciones or ""
-    }
-    with get_conn() as conn:
-        cur = conn.cursor()
-        cur.execute(
-            f"INSERT INTO {TABLE} (empleado, fecha_local, fecha_utc, tipo, observaciones) "
-            "VALUES (?, ?, ?, ?, ?);",
-            (registro["empleado"], registro["fecha_local"], registro["fecha_utc"],
-             registro["tipo"], registro["observaciones"])
-        )
-        conn.commit()
+@st.cache_resource(show_spinner=False)
+def ensure_schema(ruta: str) -> int:
+    """Aplica las migraciones pendientes de fichajes.db una sola vez por proceso."""
+    return migraciones.migrar(ruta, migraciones.FICHAJES)
+
+def insertar_fichajes(registros: list[dict]) -> tuple[int, int]:
+    """Guarda en un solo lote los fichajes con su hora y clave originales. Devuelve (insertados, duplicados)."""
+    with db.conexion(DB_FILE) as conn:
+        res = fichajes.insertar_lote(conn, registros)
+    fichajes.invalidar_lecturas(r["empleado"] for r in registros)
+    return res
+
+def encolar_fichaje(empleado: str, tipo: str, observaciones: str, sede: str | None = None) -> dict:
+    """
+    Anota el fichaje en los pendientes de la sesión con el instante real de pulsación.
+    No es un modo sin conexión: los pendientes viven en st.session_state (en el servidor)
+    y solo sirven para reintentar, con la hora y la clave originales, una escritura que
+    falló en la base. Un móvil sin red no llega a pulsar nada; los dispositivos que deban
+    guardar fichajes sin conexión los envían después en lote a ingesta.py (lista + `clave`).
+    """
+    registro = fichajes.nuevo(empleado, tipo, observaciones, sede)
+    st.session_state.setdefault("cola_fichajes", []).append(registro)
     return registro
 
-def cargar_historial(limit=100, empleado_filtro=None):
-    with get_conn() as conn:
-        base = f"SELECT empleado, fecha_local, tipo, observaciones FROM {TABLE} "
-        params = []
+def guardar_pendientes() -> tuple[int, int, list[str]]:
+    """
+    Guarda los pendientes de la sesión en un lote. Devuelve (insertados, duplicados, descartados).
+    Solo se quitan de la cola los fichajes no válidos (no se guardarían nunca; `descartados`
+    explica cada uno); el resto se guarda. Si falla la escritura, la cola se conserva para reintentar.
+    """
+    cola = st.session_state.setdefault("cola_fichajes", [])
+    descartados, validos = [], []
+    for registro in cola:
+        try:
+            fichajes.validar(registro)
+            validos.append(registro)
+        except fichajes.FichajeInvalido as e:
+            descartados.append(f"{registro.get('tipo')} {registro.get('fecha_local')}: {e}")
+    cola[:] = validos
+    if not cola:
+        return 0, 0, descartados
+    insertados, duplicados = insertar_fichajes(cola)
+    cola.clear()
+    st.session_state["historial_cursores"] = [None]   # el historial vuelve a la página más reciente
+    return insertados, duplicados, descartados
+
+PAGINA_HISTORIAL = 20
+
+def cargar_historial(limit=PAGINA_HISTORIAL, empleado_filtro=None, antes_de_id=None):
+    """
+    Página de fichajes más recientes primero; `antes_de_id` es el cursor (id de la última
+    fila de la página anterior). Recorre el índice (empleado, id), así que cada página
+    cuesta lo mismo por atrás que se esté. Devuelve hasta limit+1 filas: la sobrante
+    solo indica que hay más. Con `empleado_filtro` se cachea por empleado (fichajes.leer_cacheado).
+    Si hay años archivados lee también sus archivos (archivado.lectura): el archivado
+    conserva los ids, así que el cursor vale igual y las páginas siguen más allá de la base caliente.
+    """
+    if empleado_filtro:
+        clave = ("historial", DB_FILE, limit, antes_de_id)
+        return fichajes.leer_cacheado(
+            DB_FILE, empleado_filtro, clave, lambda: _leer_historial(limit, empleado_filtro, antes_de_id)
+        ).copy()
+    return _leer_historial(limit, empleado_filtro, antes_de_id)
+
+def _leer_historial(limit, empleado_filtro, antes_de_id):
+    # Todo el rango: un ajuste manual de un año ya archivado puede tener un id reciente.
+    # Sin años archivados, `origen` es la tabla tal cual y la consulta recorre su índice
+    with archivado.lectura(DB_FILE, TABLE, date.min, date.max) as (conn, origen):
+        base = f"SELECT id, empleado, fecha_local, tipo, observaciones FROM {origen} "
+        condiciones, params = [], []
         if empleado_filtro:
-            base += "WHERE empleado = ? "
+            condiciones.append("empleado = ?")
             params.append(empleado_filtro)
+        if antes_de_id is not None:
+            condiciones.append("id < ?")
+            params.append(int(antes_de_id))
+        if condiciones:
+            base += "WHERE " + " AND ".join(condiciones) + " "
         base += "ORDER BY id DESC LIMIT ?"
-        params.append(limit)
+        params.append(limit + 1)
         return pd.read_sql_query(base, conn, params=params)
 
 # ====== UI ======
-ensure_schema()
+ensure_schema(DB_FILE)
 # Variable compartida para almacenar contenido del QR
 if "qr_data" not in st.session_state:
     st.session_state.qr_data = ""
 
-class QRScanner(VideoTransformerBase):
-    def transform(self, frame):
-        img = frame.to_ndarray(format="bgr24")
-        detector = cv2.QRCodeDetector()
-        data, bbox, _ = detector.detectAndDecode(img)
-        if data:
-            st.session_state.qr_data = data
-        return img
-st.header("Fichaje")
-
-st.info("Escanea el código QR de la oficina para habilitar el fichaje.")
-webrtc_streamer(key="qr", video_transformer_factory=QRScanner)
-
 # Valor secreto esperado en el QR
 valor_esperado = "penades-fichaje-autorizado-2025"
 
+# Ajustes del lector de QR (opcionales en secrets)
+QR_OPCIONES = {
+    "valor_esperado": valor_esperado,
+    "cada_n_frames": int(st.secrets.get("qrCadaNFrames", 5)),
+    "intervalo_s": float(st.secrets.get("qrIntervaloSegundos", 0)),
+    "ancho_max": int(st.secrets.get("qrAnchoMax", 640)),
+}
+
+@st.cache_resource(show_spinner=False)
+def _qr_scanner():
+    """
+    Clase del lector de vídeo. Importa la pila de vídeo (webrtc/av/OpenCV) solo al necesitarla.
+    Cacheada: la página se reejecuta en cada interacción y la clase se define una vez por proceso.
+    """
+    from streamlit_webrtc import VideoTransformerBase
+    import qr
+
+    class QRScanner(VideoTransformerBase):
+        def __init__(self):
+            # Un único detector por sesión de cámara, reutilizado en cada frame
+            self.detector = qr.DetectorQR(**QR_OPCIONES)
+
+        def transform(self, frame):
+            img = frame.to_ndarray(format="bgr24")
+            if not self.detector.enclavado:
+                data = self.detector.procesar(img)
+                if data:
+                    st.session_state.qr_data = data
+            return img
+
+    return QRScanner
+
+st.header("Fichaje")
+
+# Modo de validación del QR (secrets): "video" = escaneo en directo por WebRTC,
+# "foto" = una sola foto con la cámara que el servidor decodifica una vez
+modo_qr = str(st.secrets.get("modoQR", "video")).lower()
+
+if modo_qr == "foto":
+    st.info("Haz una foto del código QR de la oficina para habilitar el fichaje.")
+    if st.session_state.qr_data != valor_esperado:
+        foto = st.camera_input("Foto del código QR")
+        if foto is not None:
+            import qr
+            st.session_state.qr_data = qr.leer_imagen(foto.getvalue())
+            if not st.session_state.qr_data:
+                st.error("No se ha encontrado ningún código QR en la foto. Inténtalo de nuevo.")
+else:
+    st.info("Escanea el código QR de la oficina para habilitar el fichaje.")
+    from streamlit_webrtc import webrtc_streamer
+    webrtc_streamer(key="qr", video_transformer_factory=_qr_scanner())
+
 if st.session_state.qr_data == valor_esperado:
     st.success("QR válido detectado. Puedes fichar.")
     permitir_fichaje = True
@@ -134,7 +197,17 @@ if not usuario_log:
     st.warning("Inicia sesión para fichar.")
     st.stop()
 
-
+# Fichajes de esta sesión que la base no pudo guardar: se reintentan con su hora original
+if st.session_state.get("cola_fichajes"):
+    pendientes = len(st.session_state["cola_fichajes"])
+    try:
+        _, _, descartados = guardar_pendientes()
+        st.success(f"{pendientes - len(descartados)} fichaje(s) pendiente(s) guardado(s).")
+        for d in descartados:
+            st.error(f"Fichaje descartado (no válido): {d}")
+    except Exception as e:
+        st.warning(f"{pendientes} fichaje(s) sin guardar por un error de la base: {e}")
+        st.button("Reintentar", use_container_width=True)
 
 
 # Observaciones opcionales
@@ -146,20 +219,26 @@ if permitir_fichaje:
     with c1:
         if st.button("Fichar ENTRADA", type="primary", use_container_width=True):
             try:
-                reg = insertar_fichaje(usuario_log, "Entrada", observaciones)
-                st.success(f"Entrada registrada — {reg['fecha_local']}")
-                st.cache_data.clear()
-                st.rerun()
+                reg = encolar_fichaje(usuario_log, "Entrada", observaciones, st.session_state.get("sede_cercana"))
+                _, _, descartados = guardar_pendientes()
+                for d in descartados:
+                    st.error(f"Fichaje descartado (no válido): {d}")
+                if not descartados:
+                    st.success(f"Entrada registrada — {reg['fecha_local']}")
+                    st.rerun()
             except Exception as e:
-                st.error(f"Error al registrar la entrada: {e}")
+                st.error(f"Error al registrar la entrada: {e}")  # queda en la cola para reintentar
 
     with c2:
         if st.button("Fichar SALIDA", use_container_width=True):
             try:
-                reg = insertar_fichaje(usuario_log, "Salida", observaciones)
-                st.success(f"Salida registrada — {reg['fecha_local']}")
-                st.cache_data.clear()
-                st.rerun()
+                reg = encolar_fichaje(usuario_log, "Salida", observaciones, st.session_state.get("sede_cercana"))
+                _, _, descartados = guardar_pendientes()
+                for d in descartados:
+                    st.error(f"Fichaje descartado (no válido): {d}")
+                if not descartados:
+                    st.success(f"Salida registrada — {reg['fecha_local']}")
+                    st.rerun()
             except Exception as e:
                 st.error(f"Error al registrar la salida: {e}")
 else:
@@ -170,7 +249,11 @@ else:
 
 # Historial (solo del usuario logueado)
 st.subheader("Tus últimos fichajes")
-df_hist = cargar_historial(limit=200, empleado_filtro=usuario_log)
+# Pila de cursores: el último es el de la página visible (None = la más reciente)
+cursores = st.session_state.setdefault("historial_cursores", [None])
+df_hist = cargar_historial(empleado_filtro=usuario_log, antes_de_id=cursores[-1])
+hay_anteriores = len(df_hist) > PAGINA_HISTORIAL
+df_hist = df_hist.iloc[:PAGINA_HISTORIAL]
 # Renombrar las columnas del DataFrame
 df_hist = df_hist.rename(columns={
     "empleado": "Empleado",
@@ -178,4 +261,14 @@ df_hist = df_hist.rename(columns={
     "tipo": "Tipo de fichaje",
     "observaciones": "Observaciones"
 })
-st.dataframe(df_hist, use_container_width=True)
\ No newline at end of file
+st.dataframe(df_hist.drop(columns="id"), use_container_width=True, hide_index=True)
+
+p1, p2 = st.columns(2)
+with p1:
+    if len(cursores) > 1 and st.button("Más recientes", use_container_width=True):
+        cursores.pop()
+        st.rerun()
+with p2:
+    if hay_anteriores and st.button("Cargar anteriores", use_container_width=True):
+        cursores.append(int(df_hist["id"].iloc[-1]))
+        st.rerun()
\ No newline at end of file
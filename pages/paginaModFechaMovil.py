@@ -1,10 +1,14 @@
 import os
-import sqlite3
 from datetime import datetime, date, time, timedelta
 import time as _time
 import pandas as pd
 import streamlit as st
 import login as login
+import db
+import migraciones
+import horas
+import fichajes
+import archivado
 
 IS_CLOUD = "/mount/src" in os.getcwd()
 DEFAULT_DATA_DIR = "/mount/data" if IS_CLOUD else os.path.join(os.path.dirname(__file__), "data")
@@ -30,34 +34,10 @@ def fecha_corta_es(d, con_anio=False):
     fmt = "%d/%m/%Y" if con_anio else "%d/%m"
     return f"{DIAS_ES[d.weekday()]} {d.strftime(fmt)}"
 
-def get_conn():
-    os.makedirs(os.path.dirname(DB_FILE), exist_ok=True)
-    return sqlite3.connect(DB_FILE)
-
-def ensure_schema():
-    # Garantiza que exista la tabla fichajes con el mismo esquema que paginaFichajeMovil
-    with get_conn() as conn:
-        cur = conn.cursor()
-        cur.execute(f"""
-            CREATE TABLE IF NOT EXISTS {TABLE} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                empleado TEXT NOT NULL,
-                fecha_local TEXT NOT NULL,   -- 'YYYY-MM-DD HH:MM:SS' (zona horaria local)
-                fecha_utc   TEXT NOT NULL,   -- 'YYYY-MM-DD HH:MM:SS' (UTC)
-                tipo TEXT NOT NULL CHECK (tipo IN ('Entrada','Salida')),
-                observaciones TEXT,
-                fuente TEXT DEFAULT 'movil',
-                created_at_utc TEXT DEFAULT (datetime('now'))
-            );
-        """)
-        conn.commit()
-
-def _local_to_utc_str(dt_local: datetime) -> str:
-    """Convierte un datetime 'naive' local a cadena UTC 'YYYY-MM-DD HH:MM:SS' sin libs externas."""
-    # offset local = now_local - now_utc (aprox, válido para España con cambio horario)
-    offset = datetime.now() - datetime.utcnow()
-    dt_utc = dt_local - offset
-    return dt_utc.strftime("%Y-%m-%d %H:%M:%S")
+@st.cache_resource(show_spinner=False)
+def ensure_schema(ruta: str) -> int:
+    """Aplica las migraciones pendientes de fichajes.db (esquema compartido con paginaFichajeMovil) una vez por proceso."""
+    return migraciones.migrar(ruta, migraciones.FICHAJES)
 
 def insertar_par_manual(empleado: str, d: date, h_entrada: time, h_salida: time, nota: str = ""):
     """Inserta un par Entrada/Salida manual para un día."""
@@ -67,10 +47,15 @@ def insertar_par_manual(empleado: str, d: date, h_entrada: time, h_salida: time,
     dt_s_local = datetime.combine(d, h_salida)
     e_local = dt_e_local.strftime("%Y-%m-%d %H:%M:%S")
     s_local = dt_s_local.strftime("%Y-%m-%d %H:%M:%S")
-    e_utc = _local_to_utc_str(dt_e_local)
-    s_utc = _local_to_utc_str(dt_s_local)
+    e_utc = fichajes.local_a_utc(dt_e_local)
+    s_utc = fichajes.local_a_utc(dt_s_local)
     obs = (nota or "").strip() or "ajuste manual desde app"
-    with get_conn() as conn:
+    with db.conexion(DB_FILE) as conn:
+        # Se comprueba con la base bloqueada: si el archivado renombra el año justo antes, se rechaza;
+        # si lo renombra después, su paso final (también BEGIN IMMEDIATE) espera y se lleva este par
+        conn.execute("BEGIN IMMEDIATE;")
+        if archivado.es_archivado(DB_FILE, d):
+            raise ValueError(f"El año {d.year} está cerrado y archivado; pide el ajuste a RR. HH.")
         cur = conn.cursor()
         cur.execute(
             f"INSERT INTO {TABLE}(empleado, fecha_local, fecha_utc, tipo, observaciones, fuente) "
@@ -82,41 +67,25 @@ def insertar_par_manual(empleado: str, d: date, h_entrada: time, h_salida: time,
             f"VALUES (?, ?, ?, 'Salida', ?, 'ajuste_movil');",
             (empleado, s_local, s_utc, obs)
         )
-        conn.commit()
+        horas.recalcular_dia(conn, empleado, d)
+    fichajes.invalidar_lecturas([empleado])
+
+def cargar_horas_semana(empleado: str, d_ini: date, d_fin: date) -> pd.DataFrame:
+    """Lee el resumen precalculado de horas_diarias (una fila por día con marcas), cacheado por empleado."""
+    clave = ("semana", DB_FILE, d_ini, d_fin)
+    return fichajes.leer_cacheado(DB_FILE, empleado, clave, lambda: _leer_horas_semana(empleado, d_ini, d_fin)).copy()
 
-def cargar_fichajes_semana(empleado: str, d_ini: date, d_fin: date) -> pd.DataFrame:
-    with get_conn() as conn:
+def _leer_horas_semana(empleado: str, d_ini: date, d_fin: date) -> pd.DataFrame:
+    # Semanas de años archivados: archivado.lectura hace ATTACH del archivo de ese año
+    with archivado.lectura(DB_FILE, "horas_diarias", d_ini, d_fin) as (conn, origen):
         q = f"""
-            SELECT id, empleado, fecha_local, tipo, observaciones, fuente
-            FROM {TABLE}
-            WHERE empleado = ?
-              AND date(fecha_local) BETWEEN ? AND ?
-            ORDER BY fecha_local ASC, id ASC;
+            SELECT fecha, marcas, segundos, incompleto
+            FROM {origen}
+            WHERE empleado = ? AND fecha BETWEEN ? AND ?
+            ORDER BY fecha ASC;
         """
         return pd.read_sql_query(q, conn, params=(empleado, d_ini.strftime("%Y-%m-%d"), d_fin.strftime("%Y-%m-%d")))
 
-def _pair_and_sum(day_df: pd.DataFrame) -> tuple[list[str], float]:
-    """Devuelve lista de marcas 'HH:MM - HH:MM' y total de horas (float)."""
-    marcas = []
-    total_seconds = 0
-    # Ordena por fecha_local
-    df = day_df.sort_values("fecha_local").reset_index(drop=True)
-    times = [(row["tipo"], datetime.strptime(row["fecha_local"], "%Y-%m-%d %H:%M:%S")) for _, row in df.iterrows()]
-    i = 0
-    while i < len(times):
-        tipo, t = times[i]
-        if tipo == "Entrada" and i + 1 < len(times) and times[i+1][0] == "Salida":
-            t2 = times[i+1][1]
-            marcas.append(f"{t.strftime('%H:%M')} - {t2.strftime('%H:%M')}")
-            total_seconds += (t2 - t).total_seconds()
-            i += 2
-        else:
-            # marca impar o desordenada
-            marcas.append(f"{t.strftime('%H:%M')} - ?")
-            i += 1
-    total_horas = round(total_seconds / 3600.0, 2)
-    return marcas, total_horas
-
 def _iso_week_start(d: date) -> date:
     # Lunes de la semana ISO del día d
     return d - timedelta(days=d.weekday())
@@ -126,7 +95,7 @@ def _week_dates(d: date) -> list[date]:
     return [start + timedelta(days=i) for i in range(7)]
 
 
-ensure_schema()
+ensure_schema(DB_FILE)
 
 st.header("Modificar fichaje")
 
@@ -145,20 +114,14 @@ d_ini, d_fin = semana[0], semana[-1]
 iso_year, iso_week, _ = ref_day.isocalendar()
 st.caption(f"Semana: **{iso_week}** ")
 
-df_sem = cargar_fichajes_semana(empleado, d_ini, d_fin)
-
-# Construye visión por día
-rows = []
-for d in semana:
-    day_str = d.strftime("%Y-%m-%d")
-    day_df = df_sem[df_sem["fecha_local"].str.startswith(day_str)]
-    marcas, total_h = _pair_and_sum(day_df)
-    rows.append({
-        "fecha": fecha_corta_es(d),
-        "marcas": " · ".join(marcas) if marcas else "—",
-        "horas": total_h
-    })
-df_view = pd.DataFrame(rows)
+# Visión por día desde el resumen precalculado (días sin fila: sin marcas, 0 horas)
+df_sem = cargar_horas_semana(empleado, d_ini, d_fin).set_index("fecha")
+df_sem = df_sem.reindex([d.strftime("%Y-%m-%d") for d in semana])
+df_view = pd.DataFrame({
+    "fecha": [fecha_corta_es(d) for d in semana],
+    "marcas": [m if isinstance(m, str) and m else "—" for m in df_sem["marcas"]],
+    "horas": [round(s / 3600.0, 2) for s in df_sem["segundos"].fillna(0)],
+})
 # Renombrar las columnas del DataFrame
 df_view = df_view.rename(columns={
     "fecha": "Fecha",
@@ -0,0 +1,65 @@
+# qr.py
+"""
+Lectura del QR de la oficina a partir de frames de vídeo o de una foto.
+
+`DetectorQR` se crea una vez por sesión de cámara y reutiliza el mismo
+cv2.QRCodeDetector. Para no ocupar un núcleo por móvil conectado:
+  - pasa el frame a escala de grises y lo reduce a `ancho_max` píxeles,
+  - solo decodifica uno de cada `cada_n_frames` (y como mucho uno cada `intervalo_s`),
+  - deja de decodificar en cuanto lee el valor esperado (queda enclavado).
+
+`leer_imagen` decodifica una única foto (modo foto: sin vídeo en el servidor).
+"""
+import time
+
+import cv2
+import numpy as np
+
+
+class DetectorQR:
+    def __init__(self, valor_esperado: str | None = None, cada_n_frames: int = 5,
+                 intervalo_s: float = 0.0, ancho_max: int = 640):
+        self.valor_esperado = valor_esperado
+        self.cada_n_frames = max(1, int(cada_n_frames))
+        self.intervalo_s = float(intervalo_s)
+        self.ancho_max = int(ancho_max)
+        self.dato = ""            # último contenido leído
+        self.enclavado = False    # True al leer el valor esperado: no se decodifica más
+        self.frames = 0
+        self.decodificados = 0
+        self._detector = cv2.QRCodeDetector()
+        self._ultimo = 0.0
+
+    def _preparar(self, img):
+        gris = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+        alto, ancho = gris.shape[:2]
+        if self.ancho_max and ancho > self.ancho_max:
+            escala = self.ancho_max / ancho
+            gris = cv2.resize(gris, (self.ancho_max, int(alto * escala)), interpolation=cv2.INTER_AREA)
+        return gris
+
+    def procesar(self, img) -> str:
+        """Procesa un frame BGR (o gris) y devuelve el último contenido leído ("" si ninguno)."""
+        self.frames += 1
+        if self.enclavado or (self.frames - 1) % self.cada_n_frames:
+            return self.dato
+        ahora = time.monotonic()
+        if self.intervalo_s and ahora - self._ultimo < self.intervalo_s:
+            return self.dato
+        self._ultimo = ahora
+        self.decodificados += 1
+
+        data, _, _ = self._detector.detectAndDecode(self._preparar(img))
+        if data:
+            self.dato = data
+            if self.valor_esperado is None or data == self.valor_esperado:
+                self.enclavado = True
+        return self.dato
+
+
+def leer_imagen(contenido: bytes, ancho_max: int = 1280) -> str:
+    """Decodifica el QR de una foto (JPEG/PNG) y devuelve su contenido ("" si no hay ninguno)."""
+    img = cv2.imdecode(np.frombuffer(contenido, np.uint8), cv2.IMREAD_GRAYSCALE)
+    if img is None:
+        return ""
+    return DetectorQR(cada_n_frames=1, ancho_max=ancho_max).procesar(img)
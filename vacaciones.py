@@ -0,0 +1,275 @@
+# vacaciones.py
+"""
+Motor de vacaciones en memoria: solapes, días laborables, saldo y ausencias por día.
+
+  - `Calendario`: laborables = lunes a viernes menos festivos (nacionales fijos,
+    Viernes Santo y los de `festivos` en secrets). Por cada año se precalcula una
+    suma acumulada de laborables, así que contar los de un rango es O(1) por año.
+  - `MotorVacaciones`: solicitudes Pendiente/Aprobado de rrhh.db. Por usuario
+    guarda los intervalos ordenados por inicio con el máximo fin acumulado, de
+    modo que "¿solapa?" es una búsqueda bisect, O(log n). El consumo por
+    (usuario, año) y la ocupación por día se mantienen al agregar/quitar, así que
+    el saldo y "quién está fuera el día X" no recorren la tabla.
+
+`motor(ruta)` devuelve la instancia compartida del proceso; se recarga de la
+base cada TTL_S segundos por si otro proceso (RR. HH.) cambió estados. Por eso
+el motor solo sirve de comprobación rápida: al guardar manda `comprobar_en_base`,
+las mismas reglas en SQL dentro de la transacción del INSERT.
+"""
+import threading
+import time
+from bisect import bisect_right
+from datetime import date, datetime, timedelta
+
+import db
+
+TABLA = "vacaciones"
+ESTADOS_ACTIVOS = ("Pendiente", "Aprobado")
+DIAS_POR_DEFECTO = 22          # laborables al año si usuarios.csv no indica dias_vacaciones
+FESTIVOS_FIJOS = {(1, 1), (1, 6), (5, 1), (8, 15), (10, 12), (11, 1), (12, 6), (12, 8), (12, 25)}
+TTL_S = 300
+
+
+class SolicitudInvalida(ValueError):
+    pass
+
+
+def _fecha(valor) -> date:
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    return datetime.strptime(str(valor)[:10], "%Y-%m-%d").date()
+
+
+def cupo(valor, defecto: int = DIAS_POR_DEFECTO) -> int:
+    """dias_vacaciones de usuarios.csv (se lee como texto) a entero; vacío, no numérico o infinito -> defecto."""
+    try:
+        return int(float(str(valor).strip().replace(",", ".")))
+    except (ValueError, OverflowError):
+        return defecto
+
+
+def _validar(ini: date, fin: date, solapada: tuple[date, date] | None, por_anio, consumidos, cupo_anual: int) -> int:
+    """Reglas de una solicitud nueva, comunes al motor y a la base. Devuelve sus laborables."""
+    if fin < ini:
+        raise SolicitudInvalida("La fecha de fin no puede ser anterior a la fecha de inicio.")
+    if solapada is not None:
+        a, b = solapada
+        raise SolicitudInvalida(f"Se solapa con otra solicitud ({a:%d/%m/%Y} → {b:%d/%m/%Y}).")
+    total = 0
+    for anio, n in por_anio(ini, fin):
+        quedan = cupo_anual - consumidos(anio)
+        if n > quedan:
+            raise SolicitudInvalida(f"Solicitas {n} día(s) laborables de {anio} y te quedan {max(quedan, 0)}.")
+        total += n
+    if total == 0:
+        raise SolicitudInvalida("El rango no incluye ningún día laborable.")
+    return total
+
+
+def domingo_pascua(anio: int) -> date:
+    """Algoritmo de Butcher (calendario gregoriano)."""
+    a, b, c = anio % 19, anio // 100, anio % 100
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mes, dia = divmod(h + l - 7 * m + 114, 31)
+    return date(anio, mes, dia + 1)
+
+
+class Calendario:
+    def __init__(self, festivos=()):
+        self.festivos = {_fecha(f) for f in festivos}
+        self._acumulados: dict[int, list[int]] = {}
+        self._lock = threading.Lock()
+
+    def _acumulado(self, anio: int) -> list[int]:
+        """acum[i] = laborables del año antes del día i+1 del año (acum[0] = 0)."""
+        acum = self._acumulados.get(anio)
+        if acum is None:
+            inicio = date(anio, 1, 1)
+            viernes_santo = domingo_pascua(anio) - timedelta(days=2)
+            acum = [0]
+            for i in range((date(anio + 1, 1, 1) - inicio).days):
+                d = inicio + timedelta(days=i)
+                laborable = (d.weekday() < 5 and (d.month, d.day) not in FESTIVOS_FIJOS
+                             and d != viernes_santo and d not in self.festivos)
+                acum.append(acum[-1] + laborable)
+            with self._lock:
+                self._acumulados[anio] = acum
+        return acum
+
+    def es_laborable(self, d: date) -> bool:
+        return self.laborables(d, d) == 1
+
+    def laborables(self, ini: date, fin: date) -> int:
+        """Días laborables entre ini y fin, ambos incluidos."""
+        total = 0
+        for anio in range(ini.year, fin.year + 1):
+            a, b = max(ini, date(anio, 1, 1)), min(fin, date(anio, 12, 31))
+            acum = self._acumulado(anio)
+            total += acum[b.timetuple().tm_yday] - acum[a.timetuple().tm_yday - 1]
+        return max(total, 0)
+
+    def por_anio(self, ini: date, fin: date):
+        """(año, laborables de [ini, fin] en ese año) por cada año del rango."""
+        for anio in range(ini.year, fin.year + 1):
+            yield anio, self.laborables(max(ini, date(anio, 1, 1)), min(fin, date(anio, 12, 31)))
+
+
+class _Intervalos:
+    """Intervalos de un usuario ordenados por inicio, con el máximo fin acumulado (ordinales)."""
+    __slots__ = ("inicios", "fines", "ids", "max_fin", "arg_max")
+
+    def __init__(self):
+        self.inicios, self.fines, self.ids = [], [], []
+        self.max_fin, self.arg_max = [], []
+
+    def _recalcular_desde(self, i: int):
+        del self.max_fin[i:], self.arg_max[i:]
+        for j in range(i, len(self.fines)):
+            if j and self.max_fin[j - 1] >= self.fines[j]:
+                self.max_fin.append(self.max_fin[j - 1])
+                self.arg_max.append(self.arg_max[j - 1])
+            else:
+                self.max_fin.append(self.fines[j])
+                self.arg_max.append(j)
+
+    def agregar(self, ini: int, fin: int, id_: int):
+        i = bisect_right(self.inicios, ini)
+        self.inicios.insert(i, ini)
+        self.fines.insert(i, fin)
+        self.ids.insert(i, id_)
+        self._recalcular_desde(i)
+
+    def quitar(self, id_: int):
+        i = self.ids.index(id_)
+        del self.inicios[i], self.fines[i], self.ids[i]
+        self._recalcular_desde(i)
+
+    def solapa(self, ini: int, fin: int) -> int | None:
+        """id de un intervalo que solapa con [ini, fin], o None."""
+        k = bisect_right(self.inicios, fin)     # los k primeros empiezan antes de que acabe [ini, fin]
+        if k and self.max_fin[k - 1] >= ini:
+            return self.ids[self.arg_max[k - 1]]
+        return None
+
+
+class MotorVacaciones:
+    def __init__(self, calendario: Calendario):
+        self.calendario = calendario
+        self._solicitudes: dict[int, tuple[str, date, date]] = {}
+        self._por_usuario: dict[str, _Intervalos] = {}
+        self._consumo: dict[tuple[str, int], int] = {}      # (usuario, año) -> laborables
+        self._por_dia: dict[int, dict[str, int]] = {}       # ordinal -> {usuario: nº solicitudes}
+        self._lock = threading.RLock()
+
+    def agregar(self, id_: int, usuario: str, ini, fin):
+        ini, fin = _fecha(ini), _fecha(fin)
+        with self._lock:
+            if id_ in self._solicitudes:
+                return
+            self._solicitudes[id_] = (usuario, ini, fin)
+            self._por_usuario.setdefault(usuario, _Intervalos()).agregar(ini.toordinal(), fin.toordinal(), id_)
+            for anio, n in self.calendario.por_anio(ini, fin):
+                self._consumo[(usuario, anio)] = self._consumo.get((usuario, anio), 0) + n
+            for o in range(ini.toordinal(), fin.toordinal() + 1):
+                dia = self._por_dia.setdefault(o, {})
+                dia[usuario] = dia.get(usuario, 0) + 1
+
+    def quitar(self, id_: int):
+        with self._lock:
+            solicitud = self._solicitudes.pop(id_, None)
+            if solicitud is None:
+                return
+            usuario, ini, fin = solicitud
+            self._por_usuario[usuario].quitar(id_)
+            for anio, n in self.calendario.por_anio(ini, fin):
+                self._consumo[(usuario, anio)] -= n
+            for o in range(ini.toordinal(), fin.toordinal() + 1):
+                dia = self._por_dia[o]
+                dia[usuario] -= 1
+                if not dia[usuario]:
+                    del dia[usuario]
+
+    def solapa(self, usuario: str, ini, fin) -> int | None:
+        with self._lock:
+            intervalos = self._por_usuario.get(usuario)
+            return intervalos.solapa(_fecha(ini).toordinal(), _fecha(fin).toordinal()) if intervalos else None
+
+    def consumidos(self, usuario: str, anio: int) -> int:
+        with self._lock:
+            return self._consumo.get((usuario, anio), 0)
+
+    def restantes(self, usuario: str, anio: int, cupo_anual: int) -> int:
+        return cupo_anual - self.consumidos(usuario, anio)
+
+    def ausentes(self, dia, equipo=None) -> list[str]:
+        """Usuarios con vacaciones Pendiente/Aprobado ese día (solo los de `equipo` si se indica)."""
+        with self._lock:
+            fuera = self._por_dia.get(_fecha(dia).toordinal(), {}).keys()
+            return sorted(fuera if equipo is None else fuera & set(equipo))
+
+    def comprobar(self, usuario: str, ini, fin, cupo_anual: int) -> int:
+        """Valida una solicitud nueva y devuelve sus días laborables. Lanza SolicitudInvalida."""
+        ini, fin = _fecha(ini), _fecha(fin)
+        with self._lock:
+            id_solapa = self.solapa(usuario, ini, fin) if fin >= ini else None
+            solapada = self._solicitudes[id_solapa][1:] if id_solapa is not None else None
+            return _validar(ini, fin, solapada, self.calendario.por_anio,
+                            lambda anio: self.consumidos(usuario, anio), cupo_anual)
+
+    def cargar(self, conn):
+        for id_, usuario, ini, fin in conn.execute(
+            f"SELECT id, usuario, fecha_inicio, fecha_fin FROM {TABLA} "
+            f"WHERE estado IN ({', '.join('?' * len(ESTADOS_ACTIVOS))});", ESTADOS_ACTIVOS
+        ):
+            self.agregar(id_, usuario, ini, fin)
+
+
+def comprobar_en_base(conn, calendario: Calendario, usuario: str, ini, fin, cupo_anual: int) -> int:
+    """
+    MotorVacaciones.comprobar contra las solicitudes activas de la base. Llamarla
+    dentro de la transacción (BEGIN IMMEDIATE) que hace el INSERT.
+    """
+    ini, fin = _fecha(ini), _fecha(fin)
+    estados = f"estado IN ({', '.join('?' * len(ESTADOS_ACTIVOS))})"
+    solapada = None
+    if fin >= ini:
+        solapada = conn.execute(
+            f"SELECT fecha_inicio, fecha_fin FROM {TABLA} WHERE usuario = ? AND {estados} "
+            "AND fecha_inicio <= ? AND fecha_fin >= ? LIMIT 1;",
+            (usuario, *ESTADOS_ACTIVOS, f"{fin:%Y-%m-%d}", f"{ini:%Y-%m-%d}")
+        ).fetchone()
+    consumo: dict[int, int] = {}
+    for a, b in conn.execute(
+        f"SELECT fecha_inicio, fecha_fin FROM {TABLA} WHERE usuario = ? AND {estados} "
+        "AND fecha_inicio <= ? AND fecha_fin >= ?;",
+        (usuario, *ESTADOS_ACTIVOS, f"{fin.year}-12-31", f"{ini.year}-01-01")
+    ):
+        for anio, n in calendario.por_anio(_fecha(a), _fecha(b)):
+            consumo[anio] = consumo.get(anio, 0) + n
+    return _validar(ini, fin, solapada and (_fecha(solapada[0]), _fecha(solapada[1])),
+                    calendario.por_anio, lambda anio: consumo.get(anio, 0), cupo_anual)
+
+
+_motores: dict[tuple, tuple[float, MotorVacaciones]] = {}
+_motores_lock = threading.Lock()
+
+
+def motor(ruta: str, festivos=(), recargar: bool = False) -> MotorVacaciones:
+    """Motor compartido del proceso para la base `ruta` (se recarga cada TTL_S segundos o con `recargar`)."""
+    clave = (ruta, tuple(sorted(str(f) for f in festivos)))
+    with _motores_lock:
+        entrada = _motores.get(clave)
+        if recargar or entrada is None or time.monotonic() - entrada[0] > TTL_S:
+            m = MotorVacaciones(Calendario(festivos))
+            with db.conexion(ruta) as conn:
+                m.cargar(conn)
+            entrada = _motores[clave] = (time.monotonic(), m)
+        return entrada[1]